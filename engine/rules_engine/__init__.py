@@ -3,8 +3,8 @@ TaxPulse Rules Engine - JSONLogic evaluation with formula computation
 Pattern: PayrollEngine's rules DSL + OpenTaxSolver's per-form approach
 """
 
-from .evaluator import RulesEvaluator
+from .evaluator import CompiledRule, RulesCompileError, RulesEvaluator
 from .formula import FormulaEngine
 from .loader import RulesLoader
 
-__all__ = ["RulesEvaluator", "FormulaEngine", "RulesLoader"]
+__all__ = ["CompiledRule", "RulesCompileError", "RulesEvaluator", "FormulaEngine", "RulesLoader"]
@@ -2,33 +2,435 @@
 Rules Evaluator - JSONLogic evaluation for tax rule conditions
 """
 
-from typing import Dict, Any, List
+from collections import OrderedDict
+from dataclasses import dataclass
+from functools import cache, lru_cache, reduce
+from typing import (
+    TYPE_CHECKING, Callable, ClassVar, Dict, Any, FrozenSet, List, Optional, Sequence, Tuple, Union,
+)
+import operator
 import re
 
+if TYPE_CHECKING:
+    import numpy as np
+    import pandas as pd
+
+CompiledExpr = Callable[[Dict[str, Any]], Any]
+# Struct-of-arrays batch: one array per referenced transaction field
+# (an ndarray, or a pd.Categorical for low-cardinality string fields)
+Columns = Dict[str, Any]
+VectorExpr = Callable[[Columns], Any]
+
+# Derived state for a rule list: (compiled rules, referenced fields, zeroed
+# buckets, result cache, batch predicates)
+RulePlan = Tuple[
+    List["CompiledRule"], Tuple[str, ...], Dict[str, float], OrderedDict,
+    List[Optional[Callable[[Columns, int], "np.ndarray"]]],
+]
+
+# String fields with fewer distinct values than this are stored as categoricals
+CATEGORICAL_MAX_CATEGORIES = 256
+# Maximum number of cached apply_rules results per rule list
+RESULT_CACHE_SIZE = 4096
+# Maximum number of rule lists with a compiled plan kept per evaluator
+PLAN_CACHE_SIZE = 16
+# Batches with fewer rows than this skip the Numba kernel and its JIT compile
+NUMBA_MIN_ROWS = 100_000
+
+
+@cache
+def _get_batch_modules() -> Tuple[Any, Any]:
+    """
+    Import NumPy and pandas on first use
+
+    Only the batch path needs them, so importing the package (and
+    RulesLoader) for scalar evaluation does not pay their import cost.
+
+    Returns:
+        Tuple of (numpy module, pandas module)
+    """
+    import numpy
+    import pandas
+    return numpy, pandas
+
+
+class RulesCompileError(ValueError):
+    """Raised when a rule condition is malformed and cannot be compiled"""
+
+
+# CompiledRule.formula_kind values
+FORMULA_BASE_RATE = "base * rate"
+FORMULA_BASE = "base"
+FORMULA_EXPRESSION = "expression"
+
+
+@dataclass(frozen=True, slots=True, eq=False)
+class CompiledRule:
+    """
+    A rule with its condition compiled and its fields resolved once
+
+    Attribute reads are slot reads instead of dict probes. source keeps the
+    original rule dictionary, which is what apply_rules reports as matched.
+    aggregation_priority is None for transaction rules (priority below 200).
+    """
+
+    code: Optional[str]
+    priority: int
+    condition: CompiledExpr
+    bucket: Optional[str]
+    formula_kind: str
+    formula: Optional[str]
+    base_source: Optional[str]
+    rate_value: float
+    aggregation_priority: Optional[int]
+    source: Dict[str, Any]
+
+
+# Compiled regex_match patterns, independent of the re module's shared cache
+_compile_pattern = lru_cache(maxsize=256)(re.compile)
+
+
+def _always_true(data: Dict[str, Any]) -> bool:
+    """Compiled form of an empty / "always: true" condition"""
+    return True
+
+
+def _constant(value: Any) -> CompiledExpr:
+    """Compile a literal into a callable returning it"""
+    return lambda data: value
+
+
+def _comparison_compiler(compare: Callable[[Any, Any], bool]) -> Callable[..., CompiledExpr]:
+    """Build a RulesEvaluator compiler for a numeric comparison operator"""
+
+    def compile_op(
+        evaluator: "RulesEvaluator", args: List[Any], numeric_fields: FrozenSet[str]
+    ) -> CompiledExpr:
+        left, left_constant = evaluator._compile_number(args[0], numeric_fields)
+        right, right_constant = evaluator._compile_number(args[1], numeric_fields)
+
+        if left_constant is not None and right_constant is not None:
+            return _constant(compare(left_constant, right_constant))
+
+        if right_constant is not None:
+            # Common shape: {">": [{"var": "gross_amount"}, 0]}
+            def evaluate(data: Dict[str, Any]) -> bool:
+                try:
+                    return compare(left(data), right_constant)
+                except (ValueError, TypeError, ArithmeticError):
+                    return False
+
+            return evaluate
+
+        def evaluate(data: Dict[str, Any]) -> bool:
+            try:
+                return compare(left(data), right(data))
+            except (ValueError, TypeError, ArithmeticError):
+                return False
+
+        return evaluate
+
+    return compile_op
+
+
+def _arithmetic_compiler(apply: Callable[[float, float], float]) -> Callable[..., CompiledExpr]:
+    """Build a RulesEvaluator compiler for a binary arithmetic operator"""
+
+    def compile_op(
+        evaluator: "RulesEvaluator", args: List[Any], numeric_fields: FrozenSet[str]
+    ) -> CompiledExpr:
+        # Field values are still coerced: Decimal and float do not mix in arithmetic
+        left, _ = evaluator._compile_number(args[0], frozenset())
+        right, _ = evaluator._compile_number(args[1], frozenset())
+
+        def evaluate(data: Dict[str, Any]) -> float:
+            try:
+                return apply(left(data), right(data))
+            except (ValueError, TypeError):
+                return 0.0
+
+        return evaluate
+
+    return compile_op
+
+
+def _comparison_vectorizer(compare: Callable[[Any, Any], Any]) -> Callable[..., Optional[VectorExpr]]:
+    """Build a RulesEvaluator vectorizer for a numeric comparison (NaN compares False)"""
+
+    def vectorize_op(evaluator: "RulesEvaluator", args: List[Any]) -> Optional[VectorExpr]:
+        left = evaluator._vectorize_value(args[0])
+        right = evaluator._vectorize_value(args[1])
+        if left is None or right is None:
+            return None
+        return lambda frame: compare(_to_float(left(frame)), _to_float(right(frame)))
+
+    return vectorize_op
+
+
+def _logical_vectorizer(combine: Callable[[Any, Any], Any], identity: bool) -> Callable[..., Optional[VectorExpr]]:
+    """Build a RulesEvaluator vectorizer for and/or"""
+
+    def vectorize_op(evaluator: "RulesEvaluator", args: List[Any]) -> Optional[VectorExpr]:
+        operands = [evaluator._vectorize_operand(arg) for arg in args]
+        if any(operand is None for operand in operands):
+            return None
+        return lambda frame: reduce(
+            combine, (_truthy(operand(frame)) for operand in operands), identity
+        )
+
+    return vectorize_op
+
+
+def _base_sources(rules: List[Dict[str, Any]]) -> FrozenSet[str]:
+    """Transaction fields used as rule bases - these are numeric by contract"""
+    return frozenset(rule["base_source"] for rule in rules if rule.get("base_source"))
+
+
+def _flatten_logical(operator_key: str, args: List[Any]) -> Tuple[List[Any], Optional[bool]]:
+    """
+    Flatten an and/or operand list at compile time
+
+    Nested operators of the same kind are merged into the parent, and
+    operands whose truthiness is known up front (literals, empty and
+    "always" conditions) are dropped. If such an operand decides the result
+    on its own (a falsy one in "and", a truthy one in "or"), that result is
+    returned as the second element.
+    """
+    absorbing = operator_key == "or"
+    operands: List[Any] = []
+
+    for arg in args:
+        if not isinstance(arg, dict):
+            static_value = bool(arg)
+        elif not arg or arg.get("always") is True or next(iter(arg)) == "always":
+            static_value = True
+        elif next(iter(arg)) == operator_key and isinstance(arg[operator_key], list):
+            nested, decided = _flatten_logical(operator_key, arg[operator_key])
+            if decided is absorbing:
+                return [], absorbing
+            # A nested operator that folds to the identity value is dropped
+            operands.extend(nested)
+            continue
+        else:
+            operands.append(arg)
+            continue
+
+        if static_value is absorbing:
+            return [], absorbing
+
+    if not operands:
+        return [], not absorbing
+    return operands, None
+
+
+def _all_of(operands: Tuple[CompiledExpr, ...]) -> CompiledExpr:
+    """Combine compiled operands with short-circuit AND"""
+    if len(operands) == 1:
+        only = operands[0]
+        return lambda data: bool(only(data))
+    if len(operands) == 2:
+        first, second = operands
+        return lambda data: bool(first(data) and second(data))
+    return lambda data: all(operand(data) for operand in operands)
+
+
+def _any_of(operands: Tuple[CompiledExpr, ...]) -> CompiledExpr:
+    """Combine compiled operands with short-circuit OR"""
+    if len(operands) == 1:
+        only = operands[0]
+        return lambda data: bool(only(data))
+    if len(operands) == 2:
+        first, second = operands
+        return lambda data: bool(first(data) or second(data))
+    return lambda data: any(operand(data) for operand in operands)
+
+
+def _referenced_fields(rules: List[Dict[str, Any]]) -> Tuple[str, ...]:
+    """Transaction fields that can influence apply_rules() for these rules"""
+    fields: Dict[str, None] = {}
+
+    def walk(expr: Any) -> None:
+        if isinstance(expr, dict):
+            if isinstance(expr.get("var"), str):
+                fields[expr["var"]] = None
+            for value in expr.values():
+                walk(value)
+        elif isinstance(expr, list):
+            for value in expr:
+                walk(value)
+
+    for rule in rules:
+        walk(rule.get("condition", {}))
+        if rule.get("base_source"):
+            fields[rule["base_source"]] = None
+
+    return tuple(fields)
+
+
+# Static per-operator cost estimates used to order and/or operands
+_OPERATOR_COSTS = {
+    "var": 1,
+    "==": 2,
+    "!=": 2,
+    ">": 2,
+    ">=": 2,
+    "<": 2,
+    "<=": 2,
+    "in": 3,
+}
+
+
+def _condition_cost(expr: Any) -> int:
+    """
+    Estimate the evaluation cost of a JSONLogic expression
+
+    Literals are free, variable lookups and comparisons are cheap, and
+    nested expressions cost the sum of their parts.
+    """
+    if not isinstance(expr, dict) or not expr:
+        return 0
+
+    operator_key = next(iter(expr))
+    args = expr[operator_key]
+    children = args if isinstance(args, list) else [args]
+    nested_cost = sum(_condition_cost(child) for child in children)
+
+    if operator_key in ("and", "or"):
+        return nested_cost + 1
+    return _OPERATOR_COSTS.get(operator_key, 4) + nested_cost
+
+
+def _to_float(value: Any) -> Any:
+    """Coerce a column or scalar to float, with NaN where float() would fail"""
+    np, pd = _get_batch_modules()
+    if isinstance(value, np.ndarray):
+        return pd.to_numeric(value, errors="coerce")
+    try:
+        return float(value)
+    except (ValueError, TypeError):
+        return np.nan
+
+
+def _truthy(value: Any) -> Any:
+    """Element-wise Python truthiness of a column or scalar"""
+    np, _ = _get_batch_modules()
+    if isinstance(value, np.ndarray):
+        return value.astype(bool)
+    return bool(value)
+
+
+def _soa(transactions: List[Dict[str, Any]], fields: Tuple[str, ...]) -> Columns:
+    """
+    Transpose transaction dictionaries into one array per referenced field
+
+    Fields holding only numbers become float64 arrays; anything else is
+    kept as an object array, with None where a transaction lacks the field.
+    """
+    np, _ = _get_batch_modules()
+    columns = {}
+    for field in fields:
+        values = [transaction.get(field) for transaction in transactions]
+        if all(type(value) in (int, float) for value in values):
+            columns[field] = np.array(values, dtype=np.float64)
+        else:
+            column = np.empty(len(values), dtype=object)
+            column[:] = values
+            columns[field] = _categorize(column)
+    return columns
+
+
+def _base_column(values: Any) -> "np.ndarray":
+    """
+    Base amounts as float64, with missing values read as 0 like apply_rules()
+
+    Values that are not numbers (e.g. a blank CSV cell) also read as 0, so a
+    bad amount on a row no rule matches cannot fail the whole batch.
+    """
+    np, pd = _get_batch_modules()
+    if not (isinstance(values, np.ndarray) and values.dtype == np.float64):
+        values = pd.to_numeric(np.asarray(values, dtype=object), errors="coerce")
+    values = np.asarray(values, dtype=np.float64)
+    return np.where(np.isnan(values), 0.0, values)
+
+
+def _categorize(column: "np.ndarray") -> Any:
+    """
+    Store a low-cardinality string column as a pd.Categorical
+
+    Equality and "in" against string literals then compare integer codes
+    instead of Python objects. Only all-string columns (missing values
+    allowed) qualify, so no two distinct values can collapse into one
+    category the way 1, 1.0 and True would.
+    """
+    _, pd = _get_batch_modules()
+    if column.dtype != object or pd.api.types.infer_dtype(column, skipna=True) != "string":
+        return column
+    categorical = pd.Categorical(column)
+    if len(categorical.categories) >= CATEGORICAL_MAX_CATEGORIES:
+        return column
+    return categorical
+
+
+def _string_literal_operand(args: List[Any]) -> Optional[Tuple[str, str]]:
+    """Match [{"var": name}, "literal"] in either order as (name, literal)"""
+    for field, literal in (args, args[::-1]):
+        if isinstance(field, dict) and list(field) == ["var"] and isinstance(field["var"], str) \
+                and isinstance(literal, str):
+            return field["var"], literal
+    return None
+
+
+def _rule_totals_numpy(
+    masks: "np.ndarray", columns: "np.ndarray", base_columns: "np.ndarray", rates: "np.ndarray"
+) -> "np.ndarray":
+    """Sum each rule's base column over its matching rows, times its rate"""
+    np, _ = _get_batch_modules()
+    return np.where(masks, columns[base_columns], 0.0).sum(axis=1) * rates
+
+
+@cache
+def _get_rule_totals_kernel() -> Callable[..., "np.ndarray"]:
+    """
+    Build the Numba kernel for _rule_totals_numpy on first use
+
+    Numba is imported and the kernel JIT-compiled only when a batch large
+    enough to use it arrives. Numba is optional; without it the NumPy
+    version is returned.
+    """
+    try:
+        from numba import njit, prange
+    except ImportError:
+        return _rule_totals_numpy
+    np, _ = _get_batch_modules()
+
+    @njit(parallel=True, cache=True)
+    def rule_totals(masks, columns, base_columns, rates):
+        """Numba kernel for _rule_totals_numpy, one rule per thread"""
+        totals = np.zeros(masks.shape[0])
+        for r in prange(masks.shape[0]):
+            column = columns[base_columns[r]]
+            total = 0.0
+            for i in range(masks.shape[1]):
+                if masks[r, i]:
+                    total += column[i]
+            totals[r] = total * rates[r]
+        return totals
+
+    return rule_totals
+
 
 class RulesEvaluator:
     """Evaluate JSONLogic conditions and apply tax rules to transactions"""
 
+    # Cache bounds, overridable per subclass or instance
+    RESULT_CACHE_SIZE = RESULT_CACHE_SIZE
+    PLAN_CACHE_SIZE = PLAN_CACHE_SIZE
+
     def __init__(self):
         """Initialize rules evaluator"""
-        self.supported_operators = {
-            "==": self._op_equal,
-            "!=": self._op_not_equal,
-            ">": self._op_greater,
-            ">=": self._op_greater_equal,
-            "<": self._op_less,
-            "<=": self._op_less_equal,
-            "and": self._op_and,
-            "or": self._op_or,
-            "in": self._op_in,
-            "var": self._op_var,
-            "if": self._op_if,
-            "+": self._op_add,
-            "-": self._op_subtract,
-            "*": self._op_multiply,
-            "/": self._op_divide,
-            "always": lambda data, args: True,
-        }
+        # LRU of ids of the rule dicts -> (rule dicts, plan); holding the dicts
+        # keeps their ids from being reused while the entry lives
+        self._result_caches: "OrderedDict[Tuple[int, ...], Tuple[List[Dict[str, Any]], RulePlan]]" = OrderedDict()
 
     def evaluate_condition(self, condition: Dict[str, Any], data: Dict[str, Any]) -> bool:
         """
@@ -49,13 +451,13 @@ class RulesEvaluator:
             return True
 
         # Get the operator (first key in condition dict)
-        operator = list(condition.keys())[0]
+        operator = next(iter(condition))
         args = condition[operator]
 
-        if operator not in self.supported_operators:
+        if operator not in self._OPERATORS:
             raise ValueError(f"Unsupported operator: {operator}")
 
-        return self.supported_operators[operator](data, args)
+        return self._OPERATORS[operator](self, data, args)
 
     def _op_var(self, data: Dict[str, Any], args: Any) -> Any:
         """
@@ -255,10 +657,10 @@ class RulesEvaluator:
                 return self._op_var(data, value["var"])
             else:
                 # Evaluate as condition and return result
-                operator = list(value.keys())[0]
+                operator = next(iter(value))
                 args = value[operator]
-                if operator in self.supported_operators:
-                    return self.supported_operators[operator](data, args)
+                if operator in self._OPERATORS:
+                    return self._OPERATORS[operator](self, data, args)
 
         # It's a literal value
         return value
@@ -268,64 +670,667 @@ class RulesEvaluator:
         Check if text matches regex pattern
         """
         try:
-            return bool(re.match(pattern, str(text)))
+            return bool(_compile_pattern(pattern).match(str(text)))
         except re.error:
             return False
 
+    def compile(
+        self,
+        condition: Dict[str, Any],
+        numeric_fields: FrozenSet[str] = frozenset()
+    ) -> CompiledExpr:
+        """
+        Compile a JSONLogic condition into a callable
+
+        The returned callable takes transaction data and behaves exactly like
+        evaluate_condition(condition, data), but the condition tree is only
+        walked once, at compile time.
+
+        Numeric literals are converted to float once, at compile time. Fields
+        listed in numeric_fields usually hold floats, so comparisons on them
+        skip the float() coercion when the value already is one; any other
+        value (string, Decimal, None) is still coerced like the interpreter.
+
+        Args:
+            condition: JSONLogic condition dictionary
+            numeric_fields: Transaction fields expected to hold float values
+
+        Returns:
+            Callable mapping transaction data to the condition result
+        """
+        if not condition:
+            return _always_true
+
+        if condition.get("always") is True:
+            return _always_true
+
+        operator_key = next(iter(condition))
+        if operator_key not in self._COMPILERS:
+            raise RulesCompileError(f"Unsupported operator: {operator_key}")
+        self._check_arity(operator_key, condition[operator_key])
+
+        return self._COMPILERS[operator_key](self, condition[operator_key], numeric_fields)
+
+    def _check_arity(self, operator_key: str, args: Any) -> None:
+        """
+        Validate an operator's argument count at compile time
+
+        Compiled closures rely on this and do not re-check their arguments.
+
+        Raises:
+            RulesCompileError: If the operator has a fixed arity and args do not match it
+        """
+        arity = self._ARITY.get(operator_key)
+        if arity is None:
+            return
+        minimum, maximum = arity
+        if not isinstance(args, list) or len(args) < minimum or (maximum is not None and len(args) > maximum):
+            expected = str(minimum) if minimum == maximum else f"at least {minimum}"
+            raise RulesCompileError(
+                f"Operator '{operator_key}' expects {expected} arguments, got {args!r}"
+            )
+
+    def _compile_value(self, value: Any, numeric_fields: FrozenSet[str]) -> CompiledExpr:
+        """Compile a value the way _resolve_value would resolve it"""
+        if isinstance(value, dict) and value:
+            if "var" in value:
+                return self._compile_var(value["var"], numeric_fields)
+            operator_key = next(iter(value))
+            if operator_key in self._COMPILERS:
+                self._check_arity(operator_key, value[operator_key])
+                return self._COMPILERS[operator_key](self, value[operator_key], numeric_fields)
+        return _constant(value)
+
+    def _compile_operand(self, value: Any, numeric_fields: FrozenSet[str]) -> CompiledExpr:
+        """Compile an and/or/if operand (conditions for dicts, values otherwise)"""
+        if isinstance(value, dict):
+            return self.compile(value, numeric_fields)
+        return self._compile_value(value, numeric_fields)
+
+    def _compile_number(
+        self, value: Any, numeric_fields: FrozenSet[str]
+    ) -> Tuple[CompiledExpr, Optional[float]]:
+        """
+        Compile a comparison/arithmetic operand into a callable returning a number
+
+        Returns the callable and, for numeric literals, the float captured at
+        compile time (None otherwise). Operands are coerced with float() on
+        each call, which may raise ValueError/TypeError like the interpreter's
+        coercion; fields in numeric_fields skip the call when they already
+        hold a float.
+        """
+        if isinstance(value, (int, float)):
+            constant = float(value)
+            return _constant(constant), constant
+
+        if isinstance(value, dict) and isinstance(value.get("var"), str) and value["var"] in numeric_fields:
+            field = value["var"]
+
+            def read_number(data: Dict[str, Any]) -> float:
+                number = data.get(field)
+                return number if number.__class__ is float else float(number)
+
+            return read_number, None
+
+        compiled = self._compile_value(value, numeric_fields)
+        return (lambda data: float(compiled(data))), None
+
+    def _compile_var(self, args: Any, numeric_fields: FrozenSet[str]) -> CompiledExpr:
+        """Compile {"var": "field_name"}"""
+        if isinstance(args, str):
+            return lambda data: data.get(args)
+        return _constant(None)
+
+    def _compile_equal(self, args: List[Any], numeric_fields: FrozenSet[str]) -> CompiledExpr:
+        """Compile {"==": [left, right]}"""
+        left = self._compile_value(args[0], numeric_fields)
+        right = self._compile_value(args[1], numeric_fields)
+        return lambda data: left(data) == right(data)
+
+    def _compile_not_equal(self, args: List[Any], numeric_fields: FrozenSet[str]) -> CompiledExpr:
+        """Compile {"!=": [left, right]}"""
+        equal = self._compile_equal(args, numeric_fields)
+        return lambda data: not equal(data)
+
+    def _compile_and(self, args: List[Any], numeric_fields: FrozenSet[str]) -> CompiledExpr:
+        """Compile {"and": [condition1, condition2, ...]}, cheapest operands first"""
+        operands, decided = _flatten_logical("and", args)
+        if decided is not None:
+            return _constant(decided)
+        compiled = tuple(
+            self._compile_operand(arg, numeric_fields) for arg in sorted(operands, key=_condition_cost)
+        )
+        return _all_of(compiled)
+
+    def _compile_or(self, args: List[Any], numeric_fields: FrozenSet[str]) -> CompiledExpr:
+        """Compile {"or": [condition1, condition2, ...]}, cheapest operands first"""
+        operands, decided = _flatten_logical("or", args)
+        if decided is not None:
+            return _constant(decided)
+        compiled = tuple(
+            self._compile_operand(arg, numeric_fields) for arg in sorted(operands, key=_condition_cost)
+        )
+        return _any_of(compiled)
+
+    def _compile_in(self, args: List[Any], numeric_fields: FrozenSet[str]) -> CompiledExpr:
+        """Compile {"in": [value, [item1, item2, ...]]}"""
+        value = self._compile_value(args[0], numeric_fields)
+        array = self._compile_value(args[1], numeric_fields)
+
+        def evaluate(data: Dict[str, Any]) -> bool:
+            items = array(data)
+            if not isinstance(items, list):
+                return False
+            return value(data) in items
+
+        return evaluate
+
+    def _compile_if(self, args: List[Any], numeric_fields: FrozenSet[str]) -> CompiledExpr:
+        """Compile {"if": [condition, true_value, false_value]}"""
+        condition = self._compile_operand(args[0], numeric_fields)
+        when_true = self._compile_value(args[1], numeric_fields)
+        when_false = self._compile_value(args[2], numeric_fields) if len(args) > 2 else _constant(False)
+        return lambda data: when_true(data) if condition(data) else when_false(data)
+
+    def _compile_add(self, args: List[Any], numeric_fields: FrozenSet[str]) -> CompiledExpr:
+        """Compile {"+": [value1, value2, ...]}"""
+        operands = tuple(self._compile_value(arg, numeric_fields) for arg in args)
+
+        def evaluate(data: Dict[str, Any]) -> float:
+            values = [operand(data) for operand in operands]
+            try:
+                return sum(float(v) for v in values if v is not None)
+            except (ValueError, TypeError):
+                return 0.0
+
+        return evaluate
+
+    def _compile_divide(self, args: List[Any], numeric_fields: FrozenSet[str]) -> CompiledExpr:
+        """Compile {"/": [dividend, divisor]} (division by zero yields 0)"""
+        left, _ = self._compile_number(args[0], frozenset())
+        right, _ = self._compile_number(args[1], frozenset())
+
+        def evaluate(data: Dict[str, Any]) -> float:
+            try:
+                divisor = right(data)
+                if divisor == 0:
+                    return 0.0
+                return left(data) / divisor
+            except (ValueError, TypeError):
+                return 0.0
+
+        return evaluate
+
+    def compile_rules(self, rules: List[Dict[str, Any]]) -> List[CompiledRule]:
+        """
+        Compile rule dictionaries into CompiledRule objects
+
+        Args:
+            rules: List of rule dictionaries
+
+        Returns:
+            List of CompiledRule in the same order
+        """
+        numeric_fields = _base_sources(rules)
+        return [self._compile_rule(rule, numeric_fields) for rule in rules]
+
+    def _compile_rule(self, rule: Dict[str, Any], numeric_fields: FrozenSet[str]) -> CompiledRule:
+        """Compile a single rule dictionary"""
+        formula = rule.get("formula")
+        if formula == FORMULA_BASE_RATE:
+            formula_kind = FORMULA_BASE_RATE
+            rate_value = float(rule.get("rate_value", 0.0))
+        elif formula == FORMULA_BASE:
+            formula_kind = FORMULA_BASE
+            rate_value = 1.0
+        else:
+            # Formula is an expression (will be handled by FormulaEngine)
+            formula_kind = FORMULA_EXPRESSION
+            rate_value = 0.0
+
+        priority = rule.get("priority", 0)
+
+        return CompiledRule(
+            code=rule.get("code"),
+            priority=priority,
+            condition=self.compile(rule.get("condition", {}), numeric_fields),
+            bucket=rule.get("output_bucket"),
+            formula_kind=formula_kind,
+            formula=formula,
+            base_source=rule.get("base_source"),
+            rate_value=rate_value,
+            aggregation_priority=priority if priority >= 200 else None,
+            source=rule,
+        )
+
     def apply_rules(
         self,
-        rules: List[Dict[str, Any]],
+        rules: Sequence[Any],
         transaction: Dict[str, Any],
-        rates_data: Dict[str, Any] = None
+        rates_data: Dict[str, Any] = None,
+        include_matched: bool = False
     ) -> Dict[str, Any]:
         """
         Apply all rules to a transaction and return computed buckets
 
+        Results are cached per rule list, keyed by the values of the
+        transaction fields the rules actually reference, so repeated postings
+        with the same fingerprint skip rule evaluation. Rule lists are
+        treated as immutable once applied.
+
         Args:
-            rules: List of rule dictionaries
+            rules: List of CompiledRule (see RulesLoader.load_compiled_rules)
+                or rule dictionaries, which are compiled on first use
             transaction: Transaction data
             rates_data: Optional rates data for rate lookups
+            include_matched: Also return the list of matched rule dictionaries
 
         Returns:
-            Dictionary mapping bucket names to computed amounts
+            Dictionary with "buckets" mapping bucket names to computed amounts,
+            plus "matched_rules" when include_matched is set
         """
-        buckets = {}
-        matched_rules = []
+        compiled_rules, fields, empty_buckets, cache, _ = self._prepare_rules(rules)
+        try:
+            fingerprint = tuple(transaction.get(field) for field in fields)
+            cached = cache.get(fingerprint)
+        except TypeError:
+            # Unhashable field values - evaluate without caching
+            fingerprint = cached = None
 
-        for rule in rules:
-            condition = rule.get("condition", {})
+        # Entries cached without matched rules cannot serve include_matched calls
+        if cached is not None and (cached[1] is not None or not include_matched):
+            cache.move_to_end(fingerprint)
+            if not include_matched:
+                return {"buckets": dict(cached[0])}
+            return {
+                "buckets": dict(cached[0]),
+                "matched_rules": list(cached[1])
+            }
 
-            # Evaluate condition
-            if self.evaluate_condition(condition, transaction):
-                matched_rules.append(rule)
+        # Every output bucket starts at 0.0, so accumulation needs no membership check
+        buckets = dict(empty_buckets)
+        matched_rules = [] if include_matched else None
 
-                # Extract rule details
-                bucket = rule.get("output_bucket")
-                formula = rule.get("formula")
-                base_source = rule.get("base_source")
-                rate_value = rule.get("rate_value", 0.0)
+        for rule in compiled_rules:
+            # Evaluate condition
+            if rule.condition(transaction):
+                if include_matched:
+                    matched_rules.append(rule.source)
 
+                bucket = rule.bucket
                 if not bucket:
                     continue
 
                 # Compute amount based on formula
-                if formula == "base * rate":
-                    base = transaction.get(base_source, 0.0)
-                    amount = float(base) * float(rate_value)
-                elif formula == "base":
-                    base = transaction.get(base_source, 0.0)
-                    amount = float(base)
+                formula_kind = rule.formula_kind
+                if formula_kind == FORMULA_BASE_RATE:
+                    amount = float(transaction.get(rule.base_source, 0.0)) * rule.rate_value
+                elif formula_kind == FORMULA_BASE:
+                    amount = float(transaction.get(rule.base_source, 0.0))
                 else:
-                    # Formula is an expression (will be handled by FormulaEngine)
                     amount = 0.0
 
-                # Add to bucket
-                if bucket in buckets:
-                    buckets[bucket] += amount
-                else:
-                    buckets[bucket] = amount
+                buckets[bucket] += amount
 
+        if fingerprint is not None:
+            cache[fingerprint] = (dict(buckets), list(matched_rules) if include_matched else None)
+            if len(cache) > self.RESULT_CACHE_SIZE:
+                cache.popitem(last=False)
+
+        if not include_matched:
+            return {"buckets": buckets}
         return {
             "buckets": buckets,
             "matched_rules": matched_rules
         }
+
+    def _prepare_rules(self, rules: Sequence[Any]) -> RulePlan:
+        """
+        Get the compiled rules, referenced fields, zeroed buckets, result cache
+        and batch predicates for a rule list
+
+        Plans are keyed on the identity of the rule dictionaries rather than
+        of the list, so a fresh list over the same rules (e.g. load_rules()
+        on a new loader) reuses the compiled plan. Everything derived from
+        the rules is kept here; rule dictionaries are never modified.
+        """
+        sources = [rule.source if isinstance(rule, CompiledRule) else rule for rule in rules]
+        key = tuple(map(id, sources))
+        entry = self._result_caches.get(key)
+        if entry is not None:
+            self._result_caches.move_to_end(key)
+            return entry[1]
+
+        numeric_fields = _base_sources(sources)
+        compiled_rules = [
+            rule if isinstance(rule, CompiledRule) else self._compile_rule(rule, numeric_fields)
+            for rule in rules
+        ]
+        empty_buckets = dict.fromkeys((rule.bucket for rule in compiled_rules if rule.bucket), 0.0)
+        plan = (
+            compiled_rules, _referenced_fields(sources), empty_buckets, OrderedDict(),
+            [None] * len(compiled_rules),
+        )
+        self._result_caches[key] = (sources, plan)
+        if len(self._result_caches) > self.PLAN_CACHE_SIZE:
+            self._result_caches.popitem(last=False)
+        return plan
+
+    def compile_vectorized(self, condition: Dict[str, Any]) -> Callable[[Columns, int], "np.ndarray"]:
+        """
+        Compile a JSONLogic condition into a batch predicate
+
+        The returned callable takes a struct-of-arrays batch (a dict mapping
+        field names to column arrays, as built by apply_rules_batch) and the
+        row count, and returns a boolean mask with one entry per row.
+        Conditions built only from var,
+        literals, comparisons, and/or and "in" over a literal list are
+        evaluated column-wise; anything else falls back to the scalar
+        compiled condition applied row by row.
+
+        Args:
+            condition: JSONLogic condition dictionary
+
+        Returns:
+            Callable mapping (columns, row count) to a boolean ndarray
+        """
+        np, pd = _get_batch_modules()
+        vector = self._vectorize_condition(condition)
+
+        if vector is None:
+            scalar = self.compile(condition)
+
+            def predicate(frame: Columns, size: int) -> "np.ndarray":
+                names = list(frame)
+                values = []
+                for name in names:
+                    # Rows missing a field (NaN in the batch) read as None, like data.get()
+                    column = np.asarray(frame[name]).astype(object)
+                    column[pd.isna(column)] = None
+                    values.append(column)
+                rows = zip(*values) if names else ([()] * size)
+                return np.fromiter(
+                    (bool(scalar(dict(zip(names, row)))) for row in rows),
+                    dtype=bool,
+                    count=size,
+                )
+
+            return predicate
+
+        def predicate(frame: Columns, size: int) -> "np.ndarray":
+            mask = np.asarray(_truthy(vector(frame)), dtype=bool)
+            return np.broadcast_to(mask, (size,))
+
+        return predicate
+
+    def _vectorize_condition(self, condition: Dict[str, Any]) -> Optional[VectorExpr]:
+        """Vectorize a condition; None if any part is unsupported"""
+        if not condition or condition.get("always") is True:
+            return _constant(True)
+
+        operator_key = next(iter(condition))
+        if operator_key not in self._COMPILERS:
+            raise RulesCompileError(f"Unsupported operator: {operator_key}")
+        self._check_arity(operator_key, condition[operator_key])
+        if operator_key not in self._VECTOR_COMPILERS:
+            return None
+
+        return self._VECTOR_COMPILERS[operator_key](self, condition[operator_key])
+
+    def _vectorize_value(self, value: Any) -> Optional[VectorExpr]:
+        """Vectorize a value; None if it is not a var or scalar literal"""
+        if isinstance(value, dict) and value:
+            if "var" in value:
+                return self._vectorize_var(value["var"])
+            operator_key = next(iter(value))
+            if operator_key in self._COMPILERS:
+                self._check_arity(operator_key, value[operator_key])
+                if operator_key not in self._VECTOR_COMPILERS:
+                    return None
+                return self._VECTOR_COMPILERS[operator_key](self, value[operator_key])
+        if isinstance(value, (dict, list)):
+            return None
+        return _constant(value)
+
+    def _vectorize_operand(self, value: Any) -> Optional[VectorExpr]:
+        """Vectorize an and/or operand (conditions for dicts, values otherwise)"""
+        if isinstance(value, dict):
+            return self._vectorize_condition(value)
+        return self._vectorize_value(value)
+
+    def _vectorize_var(self, args: Any) -> VectorExpr:
+        """Vectorize {"var": "column"} into a column read (None if absent)"""
+        if not isinstance(args, str):
+            return _constant(None)
+        np, pd = _get_batch_modules()
+
+        def column(frame: Columns) -> Any:
+            if args not in frame:
+                return None
+            values = np.asarray(frame[args])
+            # Rows missing the field (NaN in the batch) read as None, like data.get()
+            missing = pd.isna(values)
+            if missing.any():
+                values = values.astype(object)
+                values[missing] = None
+            return values
+
+        return column
+
+    def _vectorize_equal(self, args: List[Any]) -> Optional[VectorExpr]:
+        """Vectorize {"==": [left, right]}"""
+        left = self._vectorize_value(args[0])
+        right = self._vectorize_value(args[1])
+        if left is None or right is None:
+            return None
+        generic = lambda frame: left(frame) == right(frame)
+
+        operand = _string_literal_operand(args)
+        if operand is None:
+            return generic
+        name, literal = operand
+        np, pd = _get_batch_modules()
+
+        def evaluate(frame: Columns) -> Any:
+            values = frame.get(name)
+            if not isinstance(values, pd.Categorical):
+                return generic(frame)
+            # Compare category codes against the literal's code
+            if literal not in values.categories:
+                return np.zeros(len(values), dtype=bool)
+            return values.codes == values.categories.get_loc(literal)
+
+        return evaluate
+
+    def _vectorize_not_equal(self, args: List[Any]) -> Optional[VectorExpr]:
+        """Vectorize {"!=": [left, right]}"""
+        equal = self._vectorize_equal(args)
+        if equal is None:
+            return None
+        np, _ = _get_batch_modules()
+        return lambda frame: np.logical_not(equal(frame))
+
+    def _vectorize_in(self, args: List[Any]) -> Optional[VectorExpr]:
+        """Vectorize {"in": [value, [literal, ...]]}"""
+        if not isinstance(args[1], list):
+            return None
+        value = self._vectorize_value(args[0])
+        if value is None:
+            return None
+        items = args[1]
+        name = args[0].get("var") if isinstance(args[0], dict) and list(args[0]) == ["var"] else None
+        string_items = all(isinstance(item, str) for item in items)
+        np, pd = _get_batch_modules()
+
+        def evaluate(frame: Columns) -> Any:
+            if string_items and isinstance(name, str) and isinstance(frame.get(name), pd.Categorical):
+                # Compare category codes against the codes of the listed literals
+                values = frame[name]
+                codes = values.categories.get_indexer(items)
+                return np.isin(values.codes, codes[codes >= 0])
+            values = value(frame)
+            if isinstance(values, np.ndarray):
+                return pd.Series(values, dtype=object).isin(items).to_numpy()
+            return values in items
+
+        return evaluate
+
+    def apply_rules_batch(
+        self,
+        rules: Sequence[Any],
+        transactions: Union["pd.DataFrame", List[Dict[str, Any]]],
+        rates_data: Dict[str, Any] = None
+    ) -> Dict[str, Any]:
+        """
+        Apply all rules to a batch of transactions and return bucket totals
+
+        Equivalent to summing apply_rules() over every row, but each rule is
+        evaluated once per batch: its condition yields a boolean mask and its
+        contribution is summed over the matching rows. Transactions are first
+        transposed into one array per field the rules reference, so
+        predicates and base lookups are contiguous array reads.
+
+        Args:
+            rules: List of CompiledRule or rule dictionaries
+            transactions: DataFrame with one transaction per row, or a list
+                of transaction dictionaries
+            rates_data: Optional rates data for rate lookups
+
+        Returns:
+            Dictionary mapping bucket names to computed amounts
+        """
+        np, pd = _get_batch_modules()
+        compiled_rules, fields, empty_buckets, _, predicates = self._prepare_rules(rules)
+
+        size = len(transactions)
+        if isinstance(transactions, pd.DataFrame):
+            soa = {
+                field: _categorize(transactions[field].to_numpy())
+                for field in fields if field in transactions
+            }
+        else:
+            soa = _soa(transactions, fields)
+
+        # Row 0 of the column matrix is all zeros: used by rules whose base
+        # column is missing or whose formula is left to the FormulaEngine
+        columns = [np.zeros(size)]
+        column_index: Dict[str, int] = {}
+        active_buckets = []
+        masks = []
+        base_columns = []
+        rates = []
+
+        for position, rule in enumerate(compiled_rules):
+            bucket = rule.bucket
+            if not bucket:
+                continue
+
+            # Compile the batch predicate once per rule list
+            predicate = predicates[position]
+            if predicate is None:
+                predicate = predicates[position] = self.compile_vectorized(
+                    rule.source.get("condition", {})
+                )
+
+            mask = predicate(soa, size)
+            if not mask.any():
+                continue
+
+            base_column = 0
+            if rule.formula_kind != FORMULA_EXPRESSION and rule.base_source in soa:
+                base_column = column_index.get(rule.base_source, 0)
+                if not base_column:
+                    base_column = column_index[rule.base_source] = len(columns)
+                    columns.append(_base_column(soa[rule.base_source]))
+
+            active_buckets.append(bucket)
+            masks.append(mask)
+            base_columns.append(base_column)
+            rates.append(rule.rate_value)
+
+        buckets = dict(empty_buckets)
+        if not active_buckets:
+            return {"buckets": buckets}
+
+        rule_totals = _get_rule_totals_kernel() if size >= NUMBA_MIN_ROWS else _rule_totals_numpy
+        totals = rule_totals(
+            np.ascontiguousarray(np.stack(masks)),
+            np.ascontiguousarray(np.stack(columns)),
+            np.asarray(base_columns, dtype=np.int64),
+            np.asarray(rates, dtype=np.float64),
+        )
+        for bucket, amount in zip(active_buckets, totals):
+            buckets[bucket] += float(amount)
+
+        return {
+            "buckets": buckets
+        }
+
+    # Dispatch tables, shared by all instances. Entries are plain functions
+    # called with the evaluator as first argument.
+    _OPERATORS: ClassVar[Dict[str, Callable[..., Any]]] = {
+        "==": _op_equal,
+        "!=": _op_not_equal,
+        ">": _op_greater,
+        ">=": _op_greater_equal,
+        "<": _op_less,
+        "<=": _op_less_equal,
+        "and": _op_and,
+        "or": _op_or,
+        "in": _op_in,
+        "var": _op_var,
+        "if": _op_if,
+        "+": _op_add,
+        "-": _op_subtract,
+        "*": _op_multiply,
+        "/": _op_divide,
+        "always": lambda self, data, args: True,
+    }
+
+    _COMPILERS: ClassVar[Dict[str, Callable[..., CompiledExpr]]] = {
+        "==": _compile_equal,
+        "!=": _compile_not_equal,
+        ">": _comparison_compiler(operator.gt),
+        ">=": _comparison_compiler(operator.ge),
+        "<": _comparison_compiler(operator.lt),
+        "<=": _comparison_compiler(operator.le),
+        "and": _compile_and,
+        "or": _compile_or,
+        "in": _compile_in,
+        "var": _compile_var,
+        "if": _compile_if,
+        "+": _compile_add,
+        "-": _arithmetic_compiler(operator.sub),
+        "*": _arithmetic_compiler(operator.mul),
+        "/": _compile_divide,
+        "always": lambda self, args, numeric_fields: _always_true,
+    }
+
+    # Operator -> (min, max or None) argument count, checked once by _check_arity
+    _ARITY: ClassVar[Dict[str, Tuple[int, Optional[int]]]] = {
+        "==": (2, 2),
+        "!=": (2, 2),
+        ">": (2, 2),
+        ">=": (2, 2),
+        "<": (2, 2),
+        "<=": (2, 2),
+        "in": (2, 2),
+        "if": (2, None),
+        "-": (2, 2),
+        "*": (2, 2),
+        "/": (2, 2),
+    }
+
+    _VECTOR_COMPILERS: ClassVar[Dict[str, Callable[..., Optional[VectorExpr]]]] = {
+        "==": _vectorize_equal,
+        "!=": _vectorize_not_equal,
+        ">": _comparison_vectorizer(operator.gt),
+        ">=": _comparison_vectorizer(operator.ge),
+        "<": _comparison_vectorizer(operator.lt),
+        "<=": _comparison_vectorizer(operator.le),
+        "and": _logical_vectorizer(operator.and_, True),
+        "or": _logical_vectorizer(operator.or_, False),
+        "in": _vectorize_in,
+        "var": _vectorize_var,
+        "always": lambda self, args: _constant(True),
+    }
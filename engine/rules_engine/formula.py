@@ -2,239 +2,243 @@
 Formula Engine - Evaluate aggregate formulas on computed buckets
 """
 
-from typing import Dict, Any, List
-import re
+import ast
+import logging
+import operator
+from collections import OrderedDict, deque
+from functools import lru_cache
+from typing import Callable, Dict, Any, List, Optional, Sequence, Tuple
 
+from .evaluator import CompiledRule
 
-class FormulaEngine:
-    """Evaluate formulas for bucket aggregations and form line computations"""
-
-    def __init__(self):
-        """Initialize formula engine"""
-        self.functions = {
-            "SUM": self._func_sum,
-            "MAX": self._func_max,
-            "MIN": self._func_min,
-            "ABS": self._func_abs,
-            "ROUND": self._func_round,
-        }
-
-    def evaluate(self, formula: str, buckets: Dict[str, float], form_lines: Dict[str, float] = None) -> float:
-        """
-        Evaluate a formula with access to buckets and form lines
-
-        Args:
-            formula: Formula string (e.g., "SUM(VAT_OUTPUT_12, VAT_OUTPUT_ZERO) - SUM(VAT_INPUT_12)")
-            buckets: Dictionary of bucket names to values
-            form_lines: Optional dictionary of form line IDs to values
-
-        Returns:
-            Computed result as float
-        """
-        if not formula:
-            return 0.0
-
-        # Replace bucket/line references with actual values
-        resolved_formula = self._resolve_references(formula, buckets, form_lines or {})
-
-        # Evaluate functions
-        result = self._evaluate_functions(resolved_formula, buckets)
-
-        # Evaluate remaining arithmetic
-        try:
-            return float(eval(result))
-        except Exception:
-            return 0.0
+_logger = logging.getLogger(__name__)
 
-    def _resolve_references(self, formula: str, buckets: Dict[str, float], form_lines: Dict[str, float]) -> str:
-        """
-        Replace bucket and form line references with their values
+CompiledFormula = Callable[[Dict[str, float]], float]
 
-        Examples:
-            "bucket" → "100.50"
-            "line_17" → "350000.00"
-        """
-        resolved = formula
+# (line key, bucket source, compiled formula, referenced lines, referenced buckets)
+FormLineStep = Tuple[str, Optional[str], Optional[CompiledFormula], Tuple[str, ...], Tuple[str, ...]]
 
-        # Replace form line references (line_XX format)
-        for line_id, value in form_lines.items():
-            resolved = resolved.replace(line_id, str(value))
+# (mapping, line keys in mapping order, evaluation steps)
+FormPlan = Tuple[Dict[str, Any], Tuple[str, ...], Tuple[FormLineStep, ...]]
 
-        # Replace bucket references (but not inside function calls)
-        # This is tricky - we want to replace standalone bucket names but not those in SUM()
-        # For now, we'll handle this in _evaluate_functions
+# Marks a name missing from form_lines in FormulaEngine.evaluate()
+_MISSING = object()
 
-        return resolved
 
-    def _evaluate_functions(self, formula: str, buckets: Dict[str, float]) -> str:
-        """
-        Evaluate function calls like SUM(bucket1, bucket2)
+def _func_sum(*values: float) -> float:
+    """SUM function - sum all arguments"""
+    return float(sum(values))
 
-        Args:
-            formula: Formula with function calls
-            buckets: Dictionary of bucket values
 
-        Returns:
-            Formula with functions replaced by computed values
-        """
-        result = formula
+def _func_max(*values: float) -> float:
+    """MAX function - return maximum value"""
+    return float(max(values)) if values else 0.0
 
-        # Match function patterns: FUNC(arg1, arg2, ...)
-        pattern = r'(\w+)\(([\w\s,]+)\)'
 
-        while True:
-            match = re.search(pattern, result)
-            if not match:
-                break
+def _func_min(*values: float) -> float:
+    """MIN function - return minimum value"""
+    return float(min(values)) if values else 0.0
 
-            func_name = match.group(1)
-            args_str = match.group(2)
 
-            # Parse arguments
-            args = [arg.strip() for arg in args_str.split(",")]
+def _func_abs(*values: float) -> float:
+    """ABS function - absolute value of the first argument"""
+    return abs(float(values[0])) if values else 0.0
 
-            # Evaluate function
-            if func_name in self.functions:
-                func_result = self.functions[func_name](args, buckets)
-                result = result.replace(match.group(0), str(func_result))
-            else:
-                # Unknown function - leave as is
-                break
-
-        return result
 
-    def _func_sum(self, args: List[str], buckets: Dict[str, float]) -> float:
-        """
-        SUM function - sum all specified buckets
+def _func_round(*values: float) -> float:
+    """ROUND function - round value to specified decimal places"""
+    if len(values) < 2:
+        return 0.0
+    return round(float(values[0]), int(values[1]))
 
-        Args:
-            args: List of bucket names
-            buckets: Dictionary of bucket values
 
-        Returns:
-            Sum of all bucket values
-        """
-        total = 0.0
-        for arg in args:
-            value = buckets.get(arg, 0.0)
+_FUNCTIONS = {
+    "SUM": _func_sum,
+    "MAX": _func_max,
+    "MIN": _func_min,
+    "ABS": _func_abs,
+    "ROUND": _func_round,
+}
+
+_BINARY_OPERATORS = {
+    ast.Add: operator.add,
+    ast.Sub: operator.sub,
+    ast.Mult: operator.mul,
+    ast.Div: operator.truediv,
+}
+
+_UNARY_OPERATORS = {
+    ast.UAdd: operator.pos,
+    ast.USub: operator.neg,
+}
+
+
+def _build(node: ast.AST, names: Dict[str, None]) -> CompiledFormula:
+    """
+    Turn a formula AST node into a callable over a name -> value mapping
+
+    Only arithmetic over names, numbers and known function calls is accepted;
+    anything else (attributes, subscripts, comprehensions, ...) is rejected.
+    Referenced bucket/line names are recorded in `names`.
+    """
+    if isinstance(node, ast.Constant):
+        value = node.value
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            raise ValueError(f"Unsupported formula literal: {value!r}")
+        return lambda values: value
+
+    if isinstance(node, ast.Name):
+        name = node.id
+        names[name] = None
+        return lambda values: values[name]
+
+    if isinstance(node, ast.BinOp) and type(node.op) in _BINARY_OPERATORS:
+        apply = _BINARY_OPERATORS[type(node.op)]
+        left = _build(node.left, names)
+        right = _build(node.right, names)
+        return lambda values: apply(left(values), right(values))
+
+    if isinstance(node, ast.UnaryOp) and type(node.op) in _UNARY_OPERATORS:
+        apply = _UNARY_OPERATORS[type(node.op)]
+        operand = _build(node.operand, names)
+        return lambda values: apply(operand(values))
+
+    if isinstance(node, ast.Call):
+        if not isinstance(node.func, ast.Name) or node.keywords:
+            raise ValueError("Unsupported function call in formula")
+        if node.func.id not in _FUNCTIONS:
+            raise ValueError(f"Unknown formula function: {node.func.id}")
+        func = _FUNCTIONS[node.func.id]
+        args = tuple(_build(arg, names) for arg in node.args)
+        return lambda values: func(*[arg(values) for arg in args])
+
+    raise ValueError(f"Unsupported formula syntax: {type(node).__name__}")
+
+
+@lru_cache(maxsize=512)
+def _compile_formula(src: str) -> Tuple[CompiledFormula, Tuple[str, ...]]:
+    """
+    Parse and compile a formula once per distinct source string
+
+    Args:
+        src: Formula string (e.g., "SUM(VAT_OUTPUT_12) - line_26")
+
+    Returns:
+        Tuple of (compiled callable, referenced bucket/line names)
+    """
+    names: Dict[str, None] = {}
+    compiled = _build(ast.parse(src, mode="eval").body, names)
+    return compiled, tuple(names)
+
+
+def _plan_form_lines(mapping: Dict[str, Any]) -> Tuple[Tuple[str, ...], Tuple[FormLineStep, ...]]:
+    """
+    Compile a form mapping into a dependency-ordered evaluation plan
+
+    Formula lines are placed after every line they reference (Kahn's
+    algorithm, ties kept in mapping order), so each line is computed once
+    from already-final values. Lines caught in (or behind) a reference
+    cycle are logged and appended in mapping order; a reference to a line
+    not yet computed reads as 0.
+
+    Args:
+        mapping: Form mapping configuration (from mapping YAML)
+
+    Returns:
+        Tuple of (line keys in mapping order, evaluation steps)
+    """
+    # line key -> (bucket source, formula); a repeated line keeps its last definition
+    definitions: Dict[str, Tuple[Optional[str], Optional[str]]] = {}
+    for section_data in mapping.values():
+        if not isinstance(section_data, dict) or "lines" not in section_data:
+            continue
+        for line in section_data.get("lines", []):
+            line_id = line.get("line")
+            if line_id:
+                definitions[f"line_{line_id}"] = (line.get("bucket"), line.get("formula"))
+
+    steps: Dict[str, FormLineStep] = {}
+    dependents: Dict[str, List[str]] = {key: [] for key in definitions}
+    pending: Dict[str, int] = {}
+    for key, (bucket_source, formula) in definitions.items():
+        compiled, names = None, ()
+        if not bucket_source and formula:
             try:
-                total += float(value)
-            except (ValueError, TypeError):
+                compiled, names = _compile_formula(formula)
+            except Exception:
+                # Unparseable formulas evaluate to 0, as in evaluate()
                 pass
-        return total
+        # Names are classified once: form lines here, everything else a bucket
+        line_refs = tuple(name for name in names if name in definitions)
+        bucket_refs = tuple(name for name in names if name not in definitions)
+        steps[key] = (key, bucket_source, compiled, line_refs, bucket_refs)
+
+        references = set(line_refs)
+        pending[key] = len(references)
+        for reference in references:
+            dependents[reference].append(key)
+
+    order = []
+    ready = deque(key for key, count in pending.items() if not count)
+    while ready:
+        key = ready.popleft()
+        order.append(steps[key])
+        for dependent in dependents[key]:
+            pending[dependent] -= 1
+            if not pending[dependent]:
+                ready.append(dependent)
+
+    if len(order) != len(steps):
+        cyclic = [key for key, count in pending.items() if count]
+        _logger.warning("Circular form line references: %s", ", ".join(cyclic))
+        order.extend(steps[key] for key in cyclic)
+
+    return tuple(definitions), tuple(order)
 
-    def _func_max(self, args: List[str], buckets: Dict[str, float]) -> float:
-        """
-        MAX function - return maximum value
-
-        Args:
-            args: List of bucket names or literal values
-            buckets: Dictionary of bucket values
-
-        Returns:
-            Maximum value
-        """
-        values = []
-        for arg in args:
-            # Try to get from buckets first
-            if arg in buckets:
-                values.append(float(buckets[arg]))
-            else:
-                # Try to parse as literal number
-                try:
-                    values.append(float(arg))
-                except ValueError:
-                    pass
 
-        return max(values) if values else 0.0
+class FormulaEngine:
+    """Evaluate formulas for bucket aggregations and form line computations"""
 
-    def _func_min(self, args: List[str], buckets: Dict[str, float]) -> float:
-        """
-        MIN function - return minimum value
+    # Maximum number of form mappings with an evaluation plan kept per engine
+    FORM_PLAN_CACHE_SIZE = 16
 
-        Args:
-            args: List of bucket names or literal values
-            buckets: Dictionary of bucket values
-
-        Returns:
-            Minimum value
-        """
-        values = []
-        for arg in args:
-            # Try to get from buckets first
-            if arg in buckets:
-                values.append(float(buckets[arg]))
-            else:
-                # Try to parse as literal number
-                try:
-                    values.append(float(arg))
-                except ValueError:
-                    pass
+    def __init__(self):
+        """Initialize formula engine"""
+        self.functions = _FUNCTIONS
 
-        return min(values) if values else 0.0
+        # LRU of id(mapping) -> plan; holding the mapping keeps its id from being reused
+        self._form_plans: "OrderedDict[int, FormPlan]" = OrderedDict()
 
-    def _func_abs(self, args: List[str], buckets: Dict[str, float]) -> float:
+    def evaluate(self, formula: str, buckets: Dict[str, float], form_lines: Dict[str, float] = None) -> float:
         """
-        ABS function - absolute value
+        Evaluate a formula with access to buckets and form lines
 
         Args:
-            args: Single bucket name or value
-            buckets: Dictionary of bucket values
+            formula: Formula string (e.g., "SUM(VAT_OUTPUT_12, VAT_OUTPUT_ZERO) - SUM(VAT_INPUT_12)")
+            buckets: Dictionary of bucket names to values
+            form_lines: Optional dictionary of form line IDs to values
 
         Returns:
-            Absolute value
+            Computed result as float
         """
-        if not args:
+        if not formula:
             return 0.0
 
-        arg = args[0]
-
-        # Try to get from buckets first
-        if arg in buckets:
-            value = buckets[arg]
-        else:
-            # Try to parse as literal number
-            try:
-                value = float(arg)
-            except ValueError:
-                return 0.0
-
-        return abs(float(value))
-
-    def _func_round(self, args: List[str], buckets: Dict[str, float]) -> float:
-        """
-        ROUND function - round to specified decimal places
+        try:
+            compiled, names = _compile_formula(formula)
 
-        Args:
-            args: [value, decimal_places]
-            buckets: Dictionary of bucket values
+            # Form line references take precedence over bucket names;
+            # unknown references evaluate to 0
+            form_lines = form_lines or {}
+            namespace = {}
+            for name in names:
+                value = form_lines.get(name, _MISSING)
+                namespace[name] = buckets.get(name, 0.0) if value is _MISSING else value
 
-        Returns:
-            Rounded value
-        """
-        if len(args) < 2:
+            return float(compiled(namespace))
+        except Exception:
             return 0.0
 
-        value_arg = args[0]
-        decimals_arg = args[1]
-
-        # Get value
-        if value_arg in buckets:
-            value = buckets[value_arg]
-        else:
-            try:
-                value = float(value_arg)
-            except ValueError:
-                return 0.0
-
-        # Get decimal places
-        try:
-            decimals = int(decimals_arg)
-        except ValueError:
-            decimals = 2
-
-        return round(float(value), decimals)
-
     def evaluate_form_lines(
         self,
         mapping: Dict[str, Any],
@@ -250,63 +254,71 @@ class FormulaEngine:
         Returns:
             Dictionary of form line IDs to computed values
         """
-        form_lines = {}
-
-        # Get all sections from mapping
-        for section_key, section_data in mapping.items():
-            if not isinstance(section_data, dict) or "lines" not in section_data:
-                continue
-
-            lines = section_data.get("lines", [])
-
-            for line in lines:
-                line_id = line.get("line")
-                bucket_source = line.get("bucket")
-                formula = line.get("formula")
-
-                if not line_id:
-                    continue
-
-                # Compute line value
-                if bucket_source:
-                    # Direct bucket mapping
-                    form_lines[f"line_{line_id}"] = buckets.get(bucket_source, 0.0)
-
-                elif formula:
-                    # Formula evaluation (may reference other lines)
-                    computed_value = self.evaluate(formula, buckets, form_lines)
-                    form_lines[f"line_{line_id}"] = computed_value
+        line_keys, steps = self._form_plan(mapping)
+        values: Dict[str, float] = {}
+
+        for key, bucket_source, compiled, line_refs, bucket_refs in steps:
+            if bucket_source:
+                # Direct bucket mapping
+                values[key] = buckets.get(bucket_source, 0.0)
+            elif compiled is not None:
+                # Referenced lines are already computed (unless cyclic);
+                # unknown buckets and lines read as 0
+                namespace = {name: buckets.get(name, 0.0) for name in bucket_refs}
+                for name in line_refs:
+                    namespace[name] = values.get(name, 0.0)
+                try:
+                    values[key] = float(compiled(namespace))
+                except Exception:
+                    values[key] = 0.0
+            else:
+                # No source - default to 0
+                values[key] = 0.0
 
-                else:
-                    # No source - default to 0
-                    form_lines[f"line_{line_id}"] = 0.0
+        return {key: values[key] for key in line_keys}
 
-        return form_lines
+    def _form_plan(self, mapping: Dict[str, Any]) -> Tuple[Tuple[str, ...], Tuple[FormLineStep, ...]]:
+        """Get the evaluation plan for a mapping, built once per mapping object"""
+        key = id(mapping)
+        entry = self._form_plans.get(key)
+        if entry is not None and entry[0] is mapping:
+            self._form_plans.move_to_end(key)
+        else:
+            entry = self._form_plans[key] = (mapping, *_plan_form_lines(mapping))
+            self._form_plans.move_to_end(key)
+            if len(self._form_plans) > self.FORM_PLAN_CACHE_SIZE:
+                self._form_plans.popitem(last=False)
+        return entry[1], entry[2]
 
     def evaluate_aggregation_rules(
         self,
-        rules: List[Dict[str, Any]],
+        rules: Sequence[Any],
         buckets: Dict[str, float]
     ) -> Dict[str, float]:
         """
         Evaluate aggregation rules (priority 200+) that compute derived buckets
 
         Args:
-            rules: List of rule dictionaries (filtered to aggregation rules)
+            rules: List of CompiledRule or rule dictionaries (filtered to
+                aggregation rules)
             buckets: Current bucket values
 
         Returns:
             Updated buckets dictionary with aggregated values
         """
         for rule in rules:
-            priority = rule.get("priority", 0)
-
-            # Skip non-aggregation rules
-            if priority < 200:
-                continue
-
-            bucket = rule.get("output_bucket")
-            formula = rule.get("formula")
+            if isinstance(rule, CompiledRule):
+                # Aggregation status was resolved when the rule was compiled
+                if rule.aggregation_priority is None:
+                    continue
+                bucket = rule.bucket
+                formula = rule.formula
+            else:
+                # Skip non-aggregation rules
+                if rule.get("priority", 0) < 200:
+                    continue
+                bucket = rule.get("output_bucket")
+                formula = rule.get("formula")
 
             if not bucket or not formula:
                 continue
@@ -2,11 +2,178 @@
 Rules Loader - Load tax rules from YAML files
 """
 
+import hashlib
+import operator
 import os
-import yaml
-from typing import Dict, List, Any
+import pickle
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import cache, lru_cache
+from typing import Callable, Dict, List, Any, Tuple
 from pathlib import Path
 
+from .evaluator import CompiledRule, RulesEvaluator
+
+# orjson parses rate tables several times faster than the stdlib, when installed
+try:
+    from orjson import loads as _json_loads
+except ImportError:
+    from json import loads as _json_loads
+
+
+@cache
+def _get_yaml() -> Tuple[Any, type]:
+    """
+    Import PyYAML on first use
+
+    Warm starts served from the in-process or disk cache never parse YAML,
+    so they do not pay the PyYAML import cost.
+
+    Returns:
+        Tuple of (yaml module, loader class); the libyaml CSafeLoader is
+        preferred, PyYAML builds without libyaml only have SafeLoader
+    """
+    import yaml
+    return yaml, getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
+
+@lru_cache(maxsize=256)
+def _load_yaml_file(path: str, mtime_ns: int, size: int, cache_dir: str) -> Any:
+    """
+    Parse a YAML file once per process for a given path, mtime and size
+
+    Shared by every RulesLoader (and thread) in the process, so workers
+    that create loaders per request do not re-read pack files. Below this,
+    a pickled parse in the pack's disk cache is reused across processes;
+    cache read/write failures (e.g. a read-only pack) fall back to parsing.
+
+    Disk entries are keyed by source path alone and record the mtime and
+    size they were parsed at, so an edited file overwrites its entry
+    instead of leaving a stale pickle behind.
+    """
+    key = hashlib.blake2b(path.encode(), digest_size=16).hexdigest()
+    cache_path = Path(cache_dir) / f"{key}.pkl"
+
+    try:
+        with open(cache_path, "rb") as f:
+            cached_mtime_ns, cached_size, data = pickle.load(f)
+        if (cached_mtime_ns, cached_size) == (mtime_ns, size):
+            return data
+    except (OSError, pickle.UnpicklingError, EOFError, ValueError, TypeError):
+        pass
+
+    yaml, yaml_loader = _get_yaml()
+    with open(path, "r") as f:
+        data = yaml.load(f, Loader=yaml_loader)
+
+    try:
+        cache_path.parent.mkdir(exist_ok=True)
+        tmp_path = cache_path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+        with open(tmp_path, "wb") as f:
+            pickle.dump((mtime_ns, size, data), f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, cache_path)
+    except OSError:
+        pass
+
+    return data
+
+
+@lru_cache(maxsize=64)
+def _load_json_file(path: str, mtime_ns: int, size: int) -> Any:
+    """Parse a JSON file once per process for a given path, mtime and size"""
+    with open(path, "rb") as f:
+        return _json_loads(f.read())
+
+
+def _flatten_rates(rates_data: Dict[str, Any]) -> Dict[str, float]:
+    """
+    Flatten rates data into a single rate code -> value table
+
+    FWT entries are written first and overridden by EWT, then by the
+    fixed VAT codes, so a code resolves with the same precedence as the
+    lookup cascade it replaces (VAT, then EWT, then FWT).
+    """
+    flat = {}
+
+    fwt_data = rates_data.get("final_withholding_tax", {})
+    for code, info in fwt_data.items():
+        flat[code] = info.get("rate", 0.0)
+
+    ewt_data = rates_data.get("expanded_withholding_tax", {})
+    for code, info in ewt_data.items():
+        flat[code] = info.get("rate", 0.0)
+
+    vat_data = rates_data.get("vat", {})
+    standard_rate = vat_data.get("standard_rate", 0.12)
+    zero_rate = vat_data.get("zero_rated_exports", 0.00)
+    flat["VAT_12_SALES"] = flat["VAT_12_PURCHASE"] = standard_rate
+    flat["VAT_ZERO_EXPORTS"] = flat["VAT_ZERO_PURCHASE"] = zero_rate
+
+    return flat
+
+
+def _specialize_rate_lookup(flat_rates: Dict[str, float]) -> Callable[[str], float]:
+    """Build a rate lookup bound to one flattened rate table"""
+    get = flat_rates.get
+
+    def lookup(rate_code: str) -> float:
+        return get(rate_code, 0.0)
+
+    return lookup
+
+
+def _intern_condition(value: Any) -> Any:
+    """Return a JSONLogic value with operator keys and var names interned"""
+    if isinstance(value, dict):
+        return {
+            sys.intern(key) if isinstance(key, str) else key: (
+                sys.intern(arg) if key == "var" and isinstance(arg, str) else _intern_condition(arg)
+            )
+            for key, arg in value.items()
+        }
+    if isinstance(value, list):
+        return [_intern_condition(item) for item in value]
+    return value
+
+
+def _intern_rule(rule: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Return a copy of a rule with its identifiers, bucket, base source and
+    condition keys interned and the default priority filled in
+
+    The input is left untouched: parsed YAML is shared through the caches.
+    """
+    rule = dict(rule)
+    for key in ("code", "rate_code", "tax_type", "direction", "output_bucket", "base_source"):
+        if isinstance(rule.get(key), str):
+            rule[key] = sys.intern(rule[key])
+    if "condition" in rule:
+        rule["condition"] = _intern_condition(rule["condition"])
+    # With the default filled in, sorting uses a C-level itemgetter key
+    rule.setdefault("priority", 0)
+    return rule
+
+
+def _scalar_fields(rule: Dict[str, Any]) -> Dict[str, Any]:
+    """The top-level scalar fields of a rule, as load_rules_filtered() predicates see them"""
+    return {key: value for key, value in rule.items() if not isinstance(value, (dict, list))}
+
+
+@lru_cache(maxsize=256)
+def _load_rules_file(path: str, mtime_ns: int, size: int, cache_dir: str) -> Tuple[Dict[str, Any], ...]:
+    """
+    Build a rule file's rules once per process for a given path, mtime and size
+
+    Loaders share the resulting rule dictionaries, so evaluators that key
+    compiled plans on them reuse one plan across loaders.
+    """
+    data = _load_yaml_file(path, mtime_ns, size, cache_dir)
+    rules = [_intern_rule(rule) for rule in data.get("rules", [])]
+    # Sort rules by priority (higher priority first)
+    rules.sort(key=operator.itemgetter("priority"), reverse=True)
+    return tuple(rules)
+
 
 class RulesLoader:
     """Load and parse tax rules from YAML configuration files"""
@@ -25,12 +192,33 @@ class RulesLoader:
         self.validations_dir = self.pack_path / "validations"
         self.forms_dir = self.pack_path / "forms"
 
+        # Parsed YAML, pickled per source path with the mtime and size it was read at
+        self._cache_dir = self.pack_path / ".cache"
+
         # Cached data
         self._rules_cache: Dict[str, List[Dict[str, Any]]] = {}
+        self._compiled_rules_cache: Dict[str, Tuple[CompiledRule, ...]] = {}
         self._rates_cache: Dict[str, Dict[str, Any]] = {}
         self._mappings_cache: Dict[str, Dict[str, Any]] = {}
         self._validations_cache: Dict[str, List[Dict[str, Any]]] = {}
         self._forms_cache: Dict[str, Dict[str, Any]] = {}
+        # id(rates_data) -> (rates_data, rate code -> value lookup)
+        self._rate_lookup_cache: Dict[int, Tuple[Dict[str, Any], Callable[[str], float]]] = {}
+
+    def _load_yaml(self, file_path: Path) -> Any:
+        """
+        Parse a YAML file through the process-wide and on-disk caches
+
+        Args:
+            file_path: Path to the YAML file
+
+        Returns:
+            Parsed YAML data (shared between loaders - treat as read-only)
+        """
+        stat = file_path.stat()
+        return _load_yaml_file(
+            str(file_path.resolve()), stat.st_mtime_ns, stat.st_size, str(self._cache_dir)
+        )
 
     def load_rules(self, rule_file: str) -> List[Dict[str, Any]]:
         """
@@ -50,21 +238,101 @@ class RulesLoader:
         if not file_path.exists():
             raise FileNotFoundError(f"Rule file not found: {file_path}")
 
-        with open(file_path, "r") as f:
-            data = yaml.safe_load(f)
+        # Interned names make bucket/field dict lookups hit the identity fast path
+        stat = file_path.stat()
+        rules = list(_load_rules_file(
+            str(file_path.resolve()), stat.st_mtime_ns, stat.st_size, str(self._cache_dir)
+        ))
 
-        rules = data.get("rules", [])
+        self._rules_cache[rule_file] = rules
+        return rules
 
-        # Sort rules by priority (higher priority first)
-        rules.sort(key=lambda r: r.get("priority", 0), reverse=True)
+    def load_rules_filtered(
+        self, rule_file: str, predicate: Callable[[Dict[str, Any]], bool]
+    ) -> List[Dict[str, Any]]:
+        """
+        Load only the rules of a YAML file that satisfy a predicate
+
+        The file is composed into YAML nodes and only the top-level scalar
+        fields of each rule (code, priority, tax_type, ...) are built for the
+        predicate; full rule dictionaries, conditions included, are built
+        just for matching rules. Results are not cached.
+
+        The predicate always sees the same view: a dict of the rule's
+        top-level scalar fields, with priority defaulted to 0. Nested values
+        such as the condition are left out even when the file is already
+        loaded, so a predicate's answer never depends on cache state.
+
+        Args:
+            rule_file: Rule file name (e.g., 'ewt.rules.yaml')
+            predicate: Called with a rule's scalar fields; True keeps the rule
+
+        Returns:
+            List of matching rule dictionaries, sorted like load_rules()
+        """
+        if rule_file in self._rules_cache:
+            return [rule for rule in self._rules_cache[rule_file] if predicate(_scalar_fields(rule))]
+
+        file_path = self.rules_dir / rule_file
+
+        if not file_path.exists():
+            raise FileNotFoundError(f"Rule file not found: {file_path}")
+
+        yaml, yaml_loader = _get_yaml()
+        rules = []
+        with open(file_path, "r") as f:
+            loader = yaml_loader(f)
+            try:
+                root = loader.get_single_node()
+                rule_nodes = []
+                if isinstance(root, yaml.MappingNode):
+                    for key_node, value_node in root.value:
+                        if key_node.value == "rules" and isinstance(value_node, yaml.SequenceNode):
+                            rule_nodes = value_node.value
+
+                for rule_node in rule_nodes:
+                    if not isinstance(rule_node, yaml.MappingNode):
+                        continue
+                    fields = {
+                        loader.construct_object(key_node): loader.construct_object(value_node)
+                        for key_node, value_node in rule_node.value
+                        if isinstance(value_node, yaml.ScalarNode)
+                    }
+                    fields.setdefault("priority", 0)
+                    if predicate(fields):
+                        rules.append(_intern_rule(loader.construct_object(rule_node, deep=True)))
+            finally:
+                loader.dispose()
+
+        rules.sort(key=operator.itemgetter("priority"), reverse=True)
 
-        self._rules_cache[rule_file] = rules
         return rules
 
+    def load_compiled_rules(self, rule_file: str) -> Tuple[CompiledRule, ...]:
+        """
+        Load tax rules from YAML file as CompiledRule objects
+
+        Args:
+            rule_file: Rule file name (e.g., 'vat.rules.yaml')
+
+        Returns:
+            Tuple of CompiledRule, sorted by priority like load_rules()
+        """
+        if rule_file in self._compiled_rules_cache:
+            return self._compiled_rules_cache[rule_file]
+
+        compiled_rules = tuple(RulesEvaluator().compile_rules(self.load_rules(rule_file)))
+
+        self._compiled_rules_cache[rule_file] = compiled_rules
+        return compiled_rules
+
     def load_all_rules(self) -> Dict[str, List[Dict[str, Any]]]:
         """
         Load all rule files from rules directory
 
+        Files are parsed concurrently on a thread pool; libyaml parsing and
+        file reads overlap across files.
+
         Returns:
             Dictionary mapping rule file names to rule lists
         """
@@ -73,9 +341,14 @@ class RulesLoader:
         if not self.rules_dir.exists():
             return all_rules
 
-        for rule_file in self.rules_dir.glob("*.rules.yaml"):
-            rule_name = rule_file.name
-            all_rules[rule_name] = self.load_rules(rule_name)
+        rule_names = [rule_file.name for rule_file in self.rules_dir.glob("*.rules.yaml")]
+        if len(rule_names) <= 1:
+            return {rule_name: self.load_rules(rule_name) for rule_name in rule_names}
+
+        max_workers = min(8, os.cpu_count() or 1, len(rule_names))
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            for rule_name, rules in zip(rule_names, executor.map(self.load_rules, rule_names)):
+                all_rules[rule_name] = rules
 
         return all_rules
 
@@ -97,9 +370,8 @@ class RulesLoader:
         if not file_path.exists():
             raise FileNotFoundError(f"Rates file not found: {file_path}")
 
-        import json
-        with open(file_path, "r") as f:
-            rates = json.load(f)
+        stat = file_path.stat()
+        rates = _load_json_file(str(file_path.resolve()), stat.st_mtime_ns, stat.st_size)
 
         self._rates_cache[rates_file] = rates
         return rates
@@ -122,8 +394,7 @@ class RulesLoader:
         if not file_path.exists():
             raise FileNotFoundError(f"Mapping file not found: {file_path}")
 
-        with open(file_path, "r") as f:
-            mapping = yaml.safe_load(f)
+        mapping = self._load_yaml(file_path)
 
         self._mappings_cache[mapping_file] = mapping
         return mapping
@@ -146,8 +417,7 @@ class RulesLoader:
         if not file_path.exists():
             raise FileNotFoundError(f"Validation file not found: {file_path}")
 
-        with open(file_path, "r") as f:
-            data = yaml.safe_load(f)
+        data = self._load_yaml(file_path)
 
         validations = data.get("validations", {})
 
@@ -172,8 +442,7 @@ class RulesLoader:
         if not file_path.exists():
             raise FileNotFoundError(f"Form file not found: {file_path}")
 
-        with open(file_path, "r") as f:
-            form = yaml.safe_load(f)
+        form = self._load_yaml(file_path)
 
         self._forms_cache[form_file] = form
         return form
@@ -189,31 +458,34 @@ class RulesLoader:
         Returns:
             Rate value as decimal (e.g., 0.10 for 10%)
         """
-        # Check VAT rates
-        if rate_code.startswith("VAT"):
-            vat_data = rates_data.get("vat", {})
-            if rate_code == "VAT_12_SALES" or rate_code == "VAT_12_PURCHASE":
-                return vat_data.get("standard_rate", 0.12)
-            elif rate_code == "VAT_ZERO_EXPORTS" or rate_code == "VAT_ZERO_PURCHASE":
-                return vat_data.get("zero_rated_exports", 0.00)
+        return self.rate_lookup(rates_data)(rate_code)
 
-        # Check EWT rates
-        ewt_data = rates_data.get("expanded_withholding_tax", {})
-        if rate_code in ewt_data:
-            return ewt_data[rate_code].get("rate", 0.0)
+    def rate_lookup(self, rates_data: Dict[str, Any]) -> Callable[[str], float]:
+        """
+        Get a rate lookup function specialized for one rates dictionary
 
-        # Check FWT rates
-        fwt_data = rates_data.get("final_withholding_tax", {})
-        if rate_code in fwt_data:
-            return fwt_data[rate_code].get("rate", 0.0)
+        The function closes over the flattened rate table's bound get(), so
+        a lookup is a single dict probe with no branching. Hot loops can
+        hold on to it instead of calling get_rate_value per rate.
 
-        # Default: return 0.0 if not found
-        return 0.0
+        Args:
+            rates_data: Loaded rates dictionary (treated as immutable)
+
+        Returns:
+            Callable mapping a rate code to its value (0.0 if unknown)
+        """
+        entry = self._rate_lookup_cache.get(id(rates_data))
+        if entry is None or entry[0] is not rates_data:
+            entry = (rates_data, _specialize_rate_lookup(_flatten_rates(rates_data)))
+            self._rate_lookup_cache[id(rates_data)] = entry
+        return entry[1]
 
     def clear_cache(self):
         """Clear all cached data"""
         self._rules_cache.clear()
+        self._compiled_rules_cache.clear()
         self._rates_cache.clear()
         self._mappings_cache.clear()
         self._validations_cache.clear()
         self._forms_cache.clear()
+        self._rate_lookup_cache.clear()
@@ -0,0 +1,28 @@
+"""
+Shared fixtures for the TaxPulse engine tests
+"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+# Add repository root to path, like scripts/test_rules_engine.py
+REPO_ROOT = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(REPO_ROOT))
+
+from engine.rules_engine import RulesEvaluator  # noqa: E402
+
+PACK_PATH = REPO_ROOT / "packs" / "ph"
+
+
+@pytest.fixture
+def evaluator():
+    """A fresh evaluator per test, so result caches never leak between tests"""
+    return RulesEvaluator()
+
+
+@pytest.fixture
+def pack_path():
+    """Path to the Philippine tax pack"""
+    return str(PACK_PATH)
@@ -0,0 +1,229 @@
+"""
+Equivalence tests for the compiled, interpreted and batch evaluation paths
+"""
+
+import copy
+import csv
+import json
+import pickle
+import subprocess
+import sys
+from decimal import Decimal
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+from engine.rules_engine import RulesEvaluator, RulesLoader
+from engine.rules_engine import evaluator as evaluator_module
+
+TAX_CODE_VAT = {"==": [{"var": "tax_code"}, "VAT"]}
+
+ROWS = [
+    {"tax_code": "VAT", "gross_amount": 100.0},
+    {"tax_code": "EXEMPT", "gross_amount": 50.0},
+]
+
+
+def _rule(condition):
+    """A single base * rate rule writing to bucket OUT"""
+    return {
+        "code": "R1",
+        "priority": 100,
+        "condition": condition,
+        "base_source": "gross_amount",
+        "rate_value": 0.5,
+        "formula": "base * rate",
+        "output_bucket": "OUT",
+    }
+
+
+def assert_paths_agree(evaluator, condition, rows):
+    """Compiled, interpreted and batch results must all match"""
+    compiled = evaluator.compile(condition)
+    rules = [_rule(condition)]
+    expected_total = 0.0
+    for row in rows:
+        interpreted = bool(evaluator.evaluate_condition(condition, row))
+        assert bool(compiled(row)) == interpreted, (condition, row)
+        expected = float(row.get("gross_amount", 0.0)) * 0.5 if interpreted else 0.0
+        expected_total += expected
+        scalar = evaluator.apply_rules(rules, row)["buckets"]
+        assert scalar.get("OUT", 0.0) == pytest.approx(expected), (condition, row)
+    batch = evaluator.apply_rules_batch(rules, rows)["buckets"]
+    assert batch.get("OUT", 0.0) == pytest.approx(expected_total)
+
+
+@pytest.mark.parametrize("condition", [
+    {"and": [TAX_CODE_VAT, {"and": [True]}]},
+    {"and": [TAX_CODE_VAT, {"and": []}]},
+    {"or": [TAX_CODE_VAT, {"or": [False]}]},
+    {"and": [TAX_CODE_VAT, {"and": [TAX_CODE_VAT, {"and": [True]}]}]},
+    {"and": [TAX_CODE_VAT, {"and": [False]}]},
+    {"or": [TAX_CODE_VAT, {"or": [True]}]},
+])
+def test_nested_logical_identity_operands(evaluator, condition):
+    """Nested and/or folding to the identity value must not decide the parent"""
+    assert_paths_agree(evaluator, condition, ROWS)
+
+
+@pytest.mark.parametrize("amount", ["1000", Decimal("1000"), 1000, 1000.0, "abc", None])
+@pytest.mark.parametrize("condition", [
+    {">": [{"var": "gross_amount"}, 0]},
+    {">=": [{"var": "gross_amount"}, 1000]},
+    {"and": [TAX_CODE_VAT, {"<": [0, {"var": "gross_amount"}]}]},
+])
+def test_base_source_amount_types(evaluator, condition, amount):
+    """Base-source fields holding strings, Decimals or None compare like the interpreter"""
+    rows = [{"tax_code": "VAT", "gross_amount": amount}] if amount is not None else [{"tax_code": "VAT"}]
+    for row in rows:
+        interpreted = bool(evaluator.evaluate_condition(condition, row))
+        assert bool(evaluator.compile(condition, frozenset({"gross_amount"}))(row)) == interpreted
+    if amount not in ("abc", None):
+        assert_paths_agree(evaluator, condition, rows)
+
+
+def test_string_amounts_are_taxed(evaluator):
+    """Raw CSV/JSON string amounts still produce tax on the scalar and batch paths"""
+    rules = [_rule({">": [{"var": "gross_amount"}, 0]})]
+    row = {"tax_code": "VAT", "gross_amount": "200"}
+    assert evaluator.apply_rules(rules, row)["buckets"] == {"OUT": 100.0}
+    assert evaluator.apply_rules_batch(rules, [row])["buckets"] == {"OUT": 100.0}
+
+
+def test_batch_does_not_mutate_loaded_rules(evaluator, pack_path):
+    """Batch evaluation keeps its predicates to itself; loaded rules stay serializable"""
+    rules = RulesLoader(pack_path).load_rules("vat.rules.yaml")
+    snapshot = json.dumps(rules, sort_keys=True)
+    evaluator.apply_rules_batch(rules, ROWS)
+    evaluator.apply_rules(rules, ROWS[0])
+
+    fresh = RulesLoader(pack_path).load_rules("vat.rules.yaml")
+    for loaded in (rules, fresh):
+        assert json.dumps(loaded, sort_keys=True) == snapshot
+        pickle.dumps(loaded)
+
+
+def test_fresh_rule_lists_share_compiled_plan(evaluator, pack_path):
+    """A new list over the same rule dicts reuses the compiled plan and its results"""
+    rules = RulesLoader(pack_path).load_rules("vat.rules.yaml")
+    expected = evaluator.apply_rules(rules, ROWS[0])
+    for fresh in (list(rules), RulesLoader(pack_path).load_rules("vat.rules.yaml")):
+        assert evaluator._prepare_rules(fresh) is evaluator._prepare_rules(rules)
+        assert evaluator.apply_rules(fresh, ROWS[0]) == expected
+
+
+def test_plan_cache_is_bounded(evaluator):
+    """Rule lists built per call do not accumulate compiled plans"""
+    evaluator.PLAN_CACHE_SIZE = 2
+    for _ in range(5):
+        rules = [_rule({">": [{"var": "gross_amount"}, 0]})]
+        assert evaluator.apply_rules(rules, ROWS[0])["buckets"] == {"OUT": 50.0}
+    assert len(evaluator._result_caches) == 2
+
+
+def test_load_rules_leaves_shared_parse_untouched(pack_path):
+    """Interning and priority defaults go on copies, not the cached YAML parse"""
+    loader = RulesLoader(pack_path)
+    raw = loader._load_yaml(loader.rules_dir / "vat.rules.yaml")
+    snapshot = copy.deepcopy(raw)
+    rules = RulesLoader(pack_path).load_rules("vat.rules.yaml")
+    assert raw == snapshot
+    assert not {id(rule) for rule in rules} & {id(rule) for rule in raw["rules"]}
+
+
+@pytest.mark.parametrize("condition", [{}, TAX_CODE_VAT, {"!=": [{"var": "tax_code"}, "VAT"]}])
+def test_mixed_amount_rows(evaluator, condition):
+    """Float, string, Decimal and missing amounts in one batch agree with the scalar paths"""
+    rows = [
+        {"tax_code": "VAT", "gross_amount": 100.0},
+        {"tax_code": "VAT", "gross_amount": "200"},
+        {"tax_code": "VAT", "gross_amount": Decimal("300.50")},
+        {"tax_code": "VAT"},
+        {"tax_code": "EXEMPT", "gross_amount": "50"},
+    ]
+    assert_paths_agree(evaluator, condition, rows)
+
+
+@pytest.mark.parametrize("condition", [{}, TAX_CODE_VAT])
+def test_dataframe_batch_matches_list_batch(evaluator, condition):
+    """DataFrame input, missing amounts included, totals like list input and apply_rules"""
+    rows = [
+        {"tax_code": "VAT", "gross_amount": 100.0},
+        {"tax_code": "VAT"},
+        {"tax_code": "EXEMPT", "gross_amount": 50.0},
+    ]
+    rules = [_rule(condition)]
+    expected = sum(evaluator.apply_rules(rules, row)["buckets"].get("OUT", 0.0) for row in rows)
+    assert evaluator.apply_rules_batch(rules, rows)["buckets"]["OUT"] == pytest.approx(expected)
+    assert evaluator.apply_rules_batch(rules, pd.DataFrame(rows))["buckets"]["OUT"] == pytest.approx(expected)
+
+
+def test_unmatched_non_numeric_amount(evaluator):
+    """A blank amount on a row no rule matches does not fail the batch"""
+    rows = [
+        {"tax_code": "VAT", "gross_amount": "100"},
+        {"tax_code": "EXEMPT", "gross_amount": ""},
+    ]
+    rules = [_rule(TAX_CODE_VAT)]
+    expected = sum(evaluator.apply_rules(rules, row)["buckets"].get("OUT", 0.0) for row in rows)
+    assert evaluator.apply_rules_batch(rules, rows)["buckets"]["OUT"] == pytest.approx(expected)
+    assert evaluator.apply_rules_batch(rules, pd.DataFrame(rows))["buckets"]["OUT"] == pytest.approx(expected)
+
+
+def test_empty_inputs(evaluator):
+    """Empty rule lists and empty batches produce empty buckets on every path"""
+    assert evaluator.apply_rules([], ROWS[0])["buckets"] == {}
+    assert evaluator.apply_rules_batch([], ROWS)["buckets"] == {}
+    assert evaluator.apply_rules_batch([_rule(TAX_CODE_VAT)], [])["buckets"].get("OUT", 0.0) == 0.0
+
+
+@pytest.mark.parametrize("rule_file", ["vat.rules.yaml", "ewt.rules.yaml"])
+def test_pack_rules_paths_agree(evaluator, pack_path, rule_file):
+    """Pack rules give the same buckets per row, compiled, and in one batch"""
+    loader = RulesLoader(pack_path)
+    with open(f"{pack_path}/tests/fixtures/vat_basic_transactions.csv", newline="") as f:
+        rows = list(csv.DictReader(f))
+    # Raw CSV strings, floats and Decimals side by side
+    for index, row in enumerate(rows):
+        row["gross_amount"] = (str, float, Decimal)[index % 3](row["gross_amount"])
+
+    rules = loader.load_rules(rule_file)
+    snapshot = copy.deepcopy(rules)
+    compiled_rules = loader.load_compiled_rules(rule_file)
+
+    expected = {}
+    for row in rows:
+        buckets = evaluator.apply_rules(rules, row)["buckets"]
+        assert RulesEvaluator().apply_rules(compiled_rules, row)["buckets"] == pytest.approx(buckets)
+        for bucket, amount in buckets.items():
+            expected[bucket] = expected.get(bucket, 0.0) + amount
+
+    batch = evaluator.apply_rules_batch(rules, rows)["buckets"]
+    assert {bucket: amount for bucket, amount in batch.items() if amount} == pytest.approx(
+        {bucket: amount for bucket, amount in expected.items() if amount}
+    )
+    assert rules == snapshot
+
+
+def test_import_skips_batch_libraries():
+    """Importing the engine for scalar evaluation does not load NumPy, pandas or Numba"""
+    code = (
+        "import sys; import engine.rules_engine; "
+        "print(sorted({'numpy', 'pandas', 'numba'} & set(sys.modules)))"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True, check=True,
+        cwd=Path(__file__).resolve().parents[2],
+    )
+    assert result.stdout.strip() == "[]"
+
+
+def test_numba_kernel_matches_numpy(evaluator, monkeypatch):
+    """Batches above NUMBA_MIN_ROWS use the Numba kernel, with the NumPy totals"""
+    pytest.importorskip("numba")
+    rows = [{"tax_code": "VAT" if index % 3 else "EXEMPT", "gross_amount": float(index)} for index in range(50)]
+    rules = [_rule(TAX_CODE_VAT), _rule({})]
+    expected = evaluator.apply_rules_batch(rules, rows)["buckets"]
+    monkeypatch.setattr(evaluator_module, "NUMBA_MIN_ROWS", 1)
+    assert evaluator.apply_rules_batch(rules, rows)["buckets"] == pytest.approx(expected)
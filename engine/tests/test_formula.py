@@ -0,0 +1,36 @@
+"""
+Tests for form line evaluation
+"""
+
+import logging
+
+from engine.rules_engine import FormulaEngine
+
+
+def test_cyclic_form_lines_read_uncomputed_lines_as_zero(caplog):
+    """A reference cycle is logged, not raised; lines are evaluated in mapping order"""
+    mapping = {
+        "part_1": {
+            "lines": [
+                {"line": "1", "formula": "line_2 + 1"},
+                {"line": "2", "formula": "line_1 + 10"},
+                {"line": "3", "bucket": "A"},
+                {"line": "4", "formula": "line_3 + line_2"},
+            ],
+        },
+    }
+    with caplog.at_level(logging.WARNING):
+        lines = FormulaEngine().evaluate_form_lines(mapping, {"A": 5.0})
+
+    assert lines == {"line_1": 1.0, "line_2": 11.0, "line_3": 5.0, "line_4": 16.0}
+    assert "line_1, line_2, line_4" in caplog.text
+
+
+def test_form_plan_cache_is_bounded():
+    """Mappings built per call do not accumulate evaluation plans"""
+    engine = FormulaEngine()
+    engine.FORM_PLAN_CACHE_SIZE = 2
+    for value in range(5):
+        mapping = {"part_1": {"lines": [{"line": "1", "formula": f"A + {value}"}]}}
+        assert engine.evaluate_form_lines(mapping, {"A": 1.0}) == {"line_1": 1.0 + value}
+    assert len(engine._form_plans) == 2
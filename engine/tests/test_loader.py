@@ -0,0 +1,44 @@
+"""
+Tests for the rules loader caches
+"""
+
+import os
+
+from engine.rules_engine import RulesLoader
+
+
+def test_disk_cache_replaces_entry_when_file_changes(tmp_path):
+    """Editing a rule file overwrites its pickled parse instead of adding another"""
+    rules_dir = tmp_path / "rules"
+    rules_dir.mkdir()
+    rule_file = rules_dir / "test.rules.yaml"
+
+    rule_file.write_text("rules:\n  - code: FIRST\n")
+    assert RulesLoader(str(tmp_path)).load_rules("test.rules.yaml")[0]["code"] == "FIRST"
+
+    rule_file.write_text("rules:\n  - code: SECOND\n    priority: 1\n")
+    stat = rule_file.stat()
+    os.utime(rule_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+    assert RulesLoader(str(tmp_path)).load_rules("test.rules.yaml")[0]["code"] == "SECOND"
+
+    assert len(list((tmp_path / ".cache").glob("*.pkl"))) == 1
+
+
+def test_load_rules_filtered_predicate_view_ignores_cache(pack_path):
+    """The predicate sees the same scalar fields whether or not the file is loaded"""
+    seen = []
+
+    def predicate(fields):
+        seen.append(fields)
+        return "condition" not in fields and fields["priority"] >= 0
+
+    cold_loader = RulesLoader(pack_path)
+    cold = cold_loader.load_rules_filtered("ewt.rules.yaml", predicate)
+    cold_seen, seen[:] = list(seen), []
+
+    warm_loader = RulesLoader(pack_path)
+    warm_loader.load_rules("ewt.rules.yaml")
+    warm = warm_loader.load_rules_filtered("ewt.rules.yaml", predicate)
+
+    assert warm == cold
+    assert sorted(seen, key=repr) == sorted(cold_seen, key=repr)
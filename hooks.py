@@ -27,10 +27,12 @@ def post_init_hook(cr, registry):
         ]
 
         Agency = env["taxpulse.agency"]
-        for agency_data in agencies:
-            existing = Agency.search([("code", "=", agency_data["code"])], limit=1)
-            if not existing:
-                Agency.create(agency_data)
+        codes = [agency_data["code"] for agency_data in agencies]
+        existing = set(Agency.search([("code", "in", codes)]).mapped("code"))
+        missing = [agency_data for agency_data in agencies if agency_data["code"] not in existing]
+        if missing:
+            Agency.create(missing)
+            for agency_data in missing:
                 _logger.info(f"Created agency: {agency_data['code']}")
 
         _logger.info("TaxPulse PH Pack post-installation hook completed successfully")
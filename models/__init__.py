@@ -2,6 +2,7 @@
 # License AGPL-3.0 or later (https://www.gnu.org/licenses/agpl).
 
 from . import taxpulse_agency
+from . import taxpulse_sql_compute
 from . import bir_1601c
 from . import bir_2550q
 from . import bir_1702rt
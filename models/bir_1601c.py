@@ -1,7 +1,7 @@
 # Copyright 2025 InsightPulse AI Finance SSC
 # License AGPL-3.0 or later (https://www.gnu.org/licenses/agpl).
 
-from odoo import api, fields, models, _
+from odoo import api, fields, models, tools, _
 from odoo.exceptions import UserError, ValidationError
 from datetime import datetime
 import json
@@ -22,6 +22,7 @@ class BIR1601C(models.Model):
         "taxpulse.agency",
         string="Agency",
         required=True,
+        index=True,
         tracking=True,
         states={"posted": [("readonly", True)]},
     )
@@ -111,6 +112,7 @@ class BIR1601C(models.Model):
     # Supabase sync
     supabase_synced = fields.Boolean(string="Synced to Supabase", default=False)
     supabase_id = fields.Char(string="Supabase ID", readonly=True)
+    supabase_last_hash = fields.Char(string="Supabase Payload Hash", readonly=True, copy=False)
     last_sync_date = fields.Datetime(string="Last Sync Date", readonly=True)
 
     # Line items
@@ -126,7 +128,7 @@ class BIR1601C(models.Model):
         """Compute month from period end date"""
         for record in self:
             if record.period_end:
-                record.month = record.period_end.strftime("%m")
+                record.month = f"{record.period_end.month:02d}"
             else:
                 record.month = False
 
@@ -135,7 +137,7 @@ class BIR1601C(models.Model):
         """Compute year from period end date"""
         for record in self:
             if record.period_end:
-                record.year = record.period_end.strftime("%Y")
+                record.year = str(record.period_end.year)
             else:
                 record.year = False
 
@@ -145,6 +147,12 @@ class BIR1601C(models.Model):
         for record in self:
             record.total_tax_withheld = record.compensation_tax + record.final_tax
 
+    def init(self):
+        """Index the posted-form searches of the Supabase bulk sync"""
+        tools.create_index(
+            self._cr, f"{self._table}_state_agency_idx", self._table, ["state", "agency_id"]
+        )
+
     @api.model
     def create(self, vals):
         """Override create to generate sequence"""
@@ -186,15 +194,16 @@ class BIR1601C(models.Model):
 
     def action_sync_to_supabase(self):
         """Sync BIR 1601-C data to Supabase"""
+        sync_model = self.env["taxpulse.supabase.sync"]
+        sync_model._prefetch_sync_fields(self)
+        synced = {}
         for record in self:
-            sync_model = self.env["taxpulse.supabase.sync"]
             result = sync_model.sync_bir_1601c(record)
-            if result.get("success"):
-                record.write({
-                    "supabase_synced": True,
-                    "supabase_id": result.get("supabase_id"),
-                    "last_sync_date": fields.Datetime.now(),
-                })
+            # A skipped (unchanged) payload keeps its existing sync stamp
+            if result.get("success") and not result.get("skipped"):
+                synced[record.id] = (result.get("supabase_id"), result.get("payload_hash"))
+        supabase_ids, payload_hashes = zip(*synced.values()) if synced else ((), ())
+        sync_model._mark_synced(self.browse(list(synced)), supabase_ids, payload_hashes)
         return True
 
     def action_print_report(self):
@@ -206,6 +215,29 @@ class BIR1601C(models.Model):
         """Automatically compute withholding tax from account moves"""
         self.ensure_one()
 
+        # Cheap probe first: without posted tax lines in the period there is
+        # nothing to extract, so skip the move search altogether
+        self.env["account.move"].flush_model(["date", "state"])
+        self.env["account.move.line"].flush_model(["move_id", "tax_line_id"])
+        self.env.cr.execute(
+            """
+            SELECT 1
+              FROM account_move_line ml
+              JOIN account_move m ON m.id = ml.move_id
+             WHERE m.date BETWEEN %s AND %s
+               AND m.state = 'posted'
+               AND ml.tax_line_id IS NOT NULL
+             LIMIT 1
+            """,
+            (self.period_start, self.period_end),
+        )
+        if not self.env.cr.fetchone():
+            self.write({
+                "compensation_tax": 0.0,
+                "final_tax": 0.0,
+            })
+            return
+
         # Query account moves for the period
         AccountMove = self.env["account.move"]
         moves = AccountMove.search([
@@ -233,6 +265,7 @@ class BIR1601CLine(models.Model):
     """Tax line items for BIR 1601-C"""
 
     _name = "bir.1601c.line"
+    _inherit = ["taxpulse.sql.compute.mixin"]
     _description = "BIR 1601-C Tax Line"
     _order = "sequence, id"
 
@@ -261,5 +294,11 @@ class BIR1601CLine(models.Model):
     @api.depends("tax_base", "tax_rate")
     def _compute_tax_amount(self):
         """Compute tax amount"""
-        for line in self:
-            line.tax_amount = line.tax_base * (line.tax_rate / 100.0)
+        if not self._use_sql_compute():
+            for line in self:
+                line.tax_amount = line.tax_base * (line.tax_rate / 100.0)
+            return
+
+        self._store_computed_sql("tax_amount", [
+            (line.tax_base or 0.0) * ((line.tax_rate or 0.0) / 100.0) for line in self
+        ])
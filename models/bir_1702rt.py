@@ -1,7 +1,7 @@
 # Copyright 2025 InsightPulse AI Finance SSC
 # License AGPL-3.0 or later (https://www.gnu.org/licenses/agpl).
 
-from odoo import api, fields, models, _
+from odoo import api, fields, models, tools, _
 from odoo.exceptions import UserError
 
 
@@ -10,7 +10,7 @@ class BIR1702RT(models.Model):
 
     _name = "bir.1702rt"
     _description = "BIR Form 1702-RT - Annual Income Tax"
-    _inherit = ["mail.thread", "mail.activity.mixin"]
+    _inherit = ["mail.thread", "mail.activity.mixin", "taxpulse.sql.compute.mixin"]
     _order = "fiscal_year desc, agency_id"
 
     name = fields.Char(
@@ -20,6 +20,7 @@ class BIR1702RT(models.Model):
         "taxpulse.agency",
         string="Agency",
         required=True,
+        index=True,
         tracking=True,
         states={"posted": [("readonly", True)]},
     )
@@ -109,19 +110,38 @@ class BIR1702RT(models.Model):
     # Supabase sync
     supabase_synced = fields.Boolean(string="Synced to Supabase", default=False)
     supabase_id = fields.Char(string="Supabase ID", readonly=True)
+    supabase_last_hash = fields.Char(string="Supabase Payload Hash", readonly=True, copy=False)
     last_sync_date = fields.Datetime(string="Last Sync Date", readonly=True)
 
     @api.depends("gross_income", "deductions")
     def _compute_taxable_income(self):
         """Compute taxable income"""
-        for record in self:
-            record.taxable_income = record.gross_income - record.deductions
+        if not self._use_sql_compute():
+            for record in self:
+                record.taxable_income = record.gross_income - record.deductions
+            return
+
+        self._store_computed_sql("taxable_income", [
+            (record.gross_income or 0.0) - (record.deductions or 0.0) for record in self
+        ])
 
     @api.depends("income_tax_due", "tax_credits")
     def _compute_net_tax(self):
         """Compute net tax payable"""
-        for record in self:
-            record.net_tax_payable = record.income_tax_due - record.tax_credits
+        if not self._use_sql_compute():
+            for record in self:
+                record.net_tax_payable = record.income_tax_due - record.tax_credits
+            return
+
+        self._store_computed_sql("net_tax_payable", [
+            (record.income_tax_due or 0.0) - (record.tax_credits or 0.0) for record in self
+        ])
+
+    def init(self):
+        """Index the posted-form searches of the Supabase bulk sync"""
+        tools.create_index(
+            self._cr, f"{self._table}_state_agency_idx", self._table, ["state", "agency_id"]
+        )
 
     @api.model
     def create(self, vals):
@@ -162,15 +182,16 @@ class BIR1702RT(models.Model):
 
     def action_sync_to_supabase(self):
         """Sync BIR 1702-RT data to Supabase"""
+        sync_model = self.env["taxpulse.supabase.sync"]
+        sync_model._prefetch_sync_fields(self)
+        synced = {}
         for record in self:
-            sync_model = self.env["taxpulse.supabase.sync"]
             result = sync_model.sync_bir_1702rt(record)
-            if result.get("success"):
-                record.write({
-                    "supabase_synced": True,
-                    "supabase_id": result.get("supabase_id"),
-                    "last_sync_date": fields.Datetime.now(),
-                })
+            # A skipped (unchanged) payload keeps its existing sync stamp
+            if result.get("success") and not result.get("skipped"):
+                synced[record.id] = (result.get("supabase_id"), result.get("payload_hash"))
+        supabase_ids, payload_hashes = zip(*synced.values()) if synced else ((), ())
+        sync_model._mark_synced(self.browse(list(synced)), supabase_ids, payload_hashes)
         return True
 
     def action_print_report(self):
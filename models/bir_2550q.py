@@ -1,16 +1,19 @@
 # Copyright 2025 InsightPulse AI Finance SSC
 # License AGPL-3.0 or later (https://www.gnu.org/licenses/agpl).
 
-from odoo import api, fields, models, _
+from odoo import api, fields, models, tools, _
 from odoo.exceptions import UserError
 
+# Quarter of each calendar month, indexed by month - 1
+_Q = ("Q1", "Q1", "Q1", "Q2", "Q2", "Q2", "Q3", "Q3", "Q3", "Q4", "Q4", "Q4")
+
 
 class BIR2550Q(models.Model):
     """BIR Form 2550Q: Quarterly VAT Return"""
 
     _name = "bir.2550q"
     _description = "BIR Form 2550Q - Quarterly VAT"
-    _inherit = ["mail.thread", "mail.activity.mixin"]
+    _inherit = ["mail.thread", "mail.activity.mixin", "taxpulse.sql.compute.mixin"]
     _order = "quarter_end desc, agency_id"
 
     name = fields.Char(
@@ -20,6 +23,7 @@ class BIR2550Q(models.Model):
         "taxpulse.agency",
         string="Agency",
         required=True,
+        index=True,
         tracking=True,
         states={"posted": [("readonly", True)]},
     )
@@ -52,7 +56,7 @@ class BIR2550Q(models.Model):
         compute="_compute_quarter",
         store=True,
     )
-    year = fields.Char(string="Year", required=True, compute="_compute_year", store=True)
+    year = fields.Char(string="Year", required=True, compute="_compute_quarter", store=True)
 
     # VAT details
     output_vat = fields.Monetary(
@@ -96,39 +100,37 @@ class BIR2550Q(models.Model):
     # Supabase sync
     supabase_synced = fields.Boolean(string="Synced to Supabase", default=False)
     supabase_id = fields.Char(string="Supabase ID", readonly=True)
+    supabase_last_hash = fields.Char(string="Supabase Payload Hash", readonly=True, copy=False)
     last_sync_date = fields.Datetime(string="Last Sync Date", readonly=True)
 
     @api.depends("quarter_end")
     def _compute_quarter(self):
-        """Compute quarter from quarter end date"""
+        """Compute quarter and year from quarter end date"""
         for record in self:
             if record.quarter_end:
-                month = int(record.quarter_end.strftime("%m"))
-                if month <= 3:
-                    record.quarter = "Q1"
-                elif month <= 6:
-                    record.quarter = "Q2"
-                elif month <= 9:
-                    record.quarter = "Q3"
-                else:
-                    record.quarter = "Q4"
+                record.quarter = _Q[record.quarter_end.month - 1]
+                record.year = str(record.quarter_end.year)
             else:
                 record.quarter = False
-
-    @api.depends("quarter_end")
-    def _compute_year(self):
-        """Compute year from quarter end date"""
-        for record in self:
-            if record.quarter_end:
-                record.year = record.quarter_end.strftime("%Y")
-            else:
                 record.year = False
 
     @api.depends("output_vat", "input_vat")
     def _compute_vat_payable(self):
         """Compute VAT payable"""
-        for record in self:
-            record.vat_payable = record.output_vat - record.input_vat
+        if not self._use_sql_compute():
+            for record in self:
+                record.vat_payable = record.output_vat - record.input_vat
+            return
+
+        self._store_computed_sql("vat_payable", [
+            (record.output_vat or 0.0) - (record.input_vat or 0.0) for record in self
+        ])
+
+    def init(self):
+        """Index the posted-form searches of the Supabase bulk sync"""
+        tools.create_index(
+            self._cr, f"{self._table}_state_agency_idx", self._table, ["state", "agency_id"]
+        )
 
     @api.model
     def create(self, vals):
@@ -169,15 +171,16 @@ class BIR2550Q(models.Model):
 
     def action_sync_to_supabase(self):
         """Sync BIR 2550Q data to Supabase"""
+        sync_model = self.env["taxpulse.supabase.sync"]
+        sync_model._prefetch_sync_fields(self)
+        synced = {}
         for record in self:
-            sync_model = self.env["taxpulse.supabase.sync"]
             result = sync_model.sync_bir_2550q(record)
-            if result.get("success"):
-                record.write({
-                    "supabase_synced": True,
-                    "supabase_id": result.get("supabase_id"),
-                    "last_sync_date": fields.Datetime.now(),
-                })
+            # A skipped (unchanged) payload keeps its existing sync stamp
+            if result.get("success") and not result.get("skipped"):
+                synced[record.id] = (result.get("supabase_id"), result.get("payload_hash"))
+        supabase_ids, payload_hashes = zip(*synced.values()) if synced else ((), ())
+        sync_model._mark_synced(self.browse(list(synced)), supabase_ids, payload_hashes)
         return True
 
     def action_print_report(self):
@@ -3,13 +3,78 @@
 
 from odoo import api, fields, models, _
 from odoo.exceptions import UserError
+from collections import namedtuple
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, as_completed, wait
+from itertools import chain
+from requests.adapters import HTTPAdapter
 import requests
+import functools
+import hashlib
 import os
 import logging
 import json
 
 _logger = logging.getLogger(__name__)
 
+# orjson serializes batch payloads several times faster than the stdlib, when installed
+try:
+    from orjson import dumps as _json_dumps
+except ImportError:
+    def _json_dumps(data):
+        return json.dumps(data).encode()
+
+# Records sent per batch RPC call in bulk syncs
+SYNC_BATCH_SIZE = 100
+
+# Concurrent HTTP requests in bulk syncs (below the session's pool size)
+SYNC_MAX_WORKERS = 8
+
+# Requests built and queued ahead of the workers in bulk syncs
+SYNC_MAX_IN_FLIGHT = 2 * SYNC_MAX_WORKERS
+
+SyncSpec = namedtuple("SyncSpec", ["key", "label", "rpc", "batch_rpc", "fields"])
+
+# Per BIR form model: results key, log label, upsert RPC, batch upsert RPC (if
+# any) and the form fields synced between the common identity columns
+# (odoo_id, agency, form_number) and the trailing state/tin/rdo_code columns
+_SYNC_SPEC = {
+    "bir.1601c": SyncSpec("bir_1601c", "BIR 1601-C", "upsert_bir_1601c", "upsert_bir_1601c_batch", [
+        "period_start", "period_end", "month", "year",
+        "compensation_tax", "final_tax", "total_tax_withheld",
+    ]),
+    "bir.2550q": SyncSpec("bir_2550q", "BIR 2550Q", "upsert_bir_2550q", None, [
+        "quarter_start", "quarter_end", "quarter", "year",
+        "output_vat", "input_vat", "vat_payable",
+    ]),
+    "bir.1702rt": SyncSpec("bir_1702rt", "BIR 1702-RT", "upsert_bir_1702rt", None, [
+        "fiscal_year", "period_start", "period_end",
+        "gross_income", "deductions", "taxable_income",
+        "income_tax_due", "tax_credits", "net_tax_payable",
+    ]),
+}
+
+
+def _payload_hash(data):
+    """Content hash of an RPC payload, to detect unchanged records"""
+    return hashlib.blake2b(_json_dumps(data), digest_size=16).hexdigest()
+
+
+@functools.lru_cache(maxsize=1)
+def _supabase_env_config():
+    """Supabase URL and service role key, read from the environment once per process"""
+    return (
+        os.environ.get("SUPABASE_URL", "https://xkxyvboeubffxxbebsll.supabase.co"),
+        os.environ.get("SUPABASE_SERVICE_ROLE_KEY"),
+    )
+
+
+@functools.lru_cache(maxsize=1)
+def _http_session():
+    """Shared keep-alive session, created lazily once per worker process"""
+    session = requests.Session()
+    session.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=32))
+    return session
+
 
 class TaxPulseSupabaseSync(models.Model):
     """Supabase synchronization handler for TaxPulse"""
@@ -19,9 +84,10 @@ class TaxPulseSupabaseSync(models.Model):
 
     def _get_supabase_config(self):
         """Get Supabase configuration from environment"""
+        url, service_role_key = _supabase_env_config()
         config = {
-            "url": os.environ.get("SUPABASE_URL", "https://xkxyvboeubffxxbebsll.supabase.co"),
-            "service_role_key": os.environ.get("SUPABASE_SERVICE_ROLE_KEY"),
+            "url": url,
+            "service_role_key": service_role_key,
         }
 
         if not config["service_role_key"]:
@@ -31,9 +97,11 @@ class TaxPulseSupabaseSync(models.Model):
 
         return config
 
-    def _make_supabase_request(self, endpoint, method="POST", data=None):
+    def _make_supabase_request(self, endpoint, method="POST", data=None, session=None, config=None):
         """Make authenticated request to Supabase RPC endpoint"""
-        config = self._get_supabase_config()
+        # Pooled keep-alive session: consecutive calls reuse the TLS connection
+        session = session or _http_session()
+        config = config or self._get_supabase_config()
         url = f"{config['url']}/rest/v1/rpc/{endpoint}"
 
         headers = {
@@ -44,9 +112,10 @@ class TaxPulseSupabaseSync(models.Model):
 
         try:
             if method == "POST":
-                response = requests.post(url, headers=headers, json=data, timeout=20)
+                body = _json_dumps(data) if data is not None else None
+                response = session.post(url, headers=headers, data=body, timeout=20)
             elif method == "GET":
-                response = requests.get(url, headers=headers, params=data, timeout=20)
+                response = session.get(url, headers=headers, params=data, timeout=20)
             else:
                 raise ValueError(f"Unsupported HTTP method: {method}")
 
@@ -60,138 +129,171 @@ class TaxPulseSupabaseSync(models.Model):
             _logger.error(f"Supabase request error: {str(e)}")
             return {"success": False, "error": str(e)}
 
-    def sync_bir_1601c(self, record):
-        """Sync BIR 1601-C form to Supabase"""
+    def _prefetch_sync_fields(self, records):
+        """Load the synced fields of records and their agencies in one query each"""
+        form_fields = _SYNC_SPEC[records._name].fields
+        records.fetch([
+            "name", "agency_id", *form_fields, "state",
+            "supabase_synced", "supabase_id", "supabase_last_hash",
+        ])
+        records.agency_id.fetch(["code", "name", "tin", "rdo_code"])
+
+    def _sync_rows(self, records):
+        """Read records and their agencies, one query each, into bir.form_* column dicts"""
+        form_fields = _SYNC_SPEC[records._name].fields
+        date_fields = [name for name in form_fields if records._fields[name].type == "date"]
+        agencies = {
+            agency["id"]: agency
+            for agency in records.agency_id.read(["code", "name", "tin", "rdo_code"], load=None)
+        }
+
+        rows = []
+        for vals in records.read(["name", "agency_id", *form_fields, "state"], load=None):
+            agency = agencies[vals["agency_id"]]
+            for name in date_fields:
+                vals[name] = vals[name].isoformat() if vals[name] else None
+            row = {
+                "odoo_id": vals["id"],
+                "agency_code": agency["code"],
+                "agency_name": agency["name"],
+                "form_number": vals["name"],
+            }
+            row.update((name, vals[name]) for name in form_fields)
+            row["state"] = vals["state"]
+            row["tin"] = agency["tin"] or ""
+            row["rdo_code"] = agency["rdo_code"] or ""
+            rows.append(row)
+        return rows
+
+    def _mark_synced(self, records, supabase_ids, payload_hashes):
+        """Flag records as synced with one UPDATE, stamped with a single sync time"""
+        if not records:
+            return
+        # The raw UPDATE bypasses the ORM, so enforce write access up front
+        records.check_access("write")
+        now = fields.Datetime.now()
+        sync_fields = [
+            "supabase_synced", "supabase_id", "supabase_last_hash", "last_sync_date",
+            "write_uid", "write_date",
+        ]
+        records.flush_recordset(sync_fields)
+        self.env.cr.execute(
+            f'UPDATE "{records._table}" AS form '
+            "SET supabase_synced = TRUE, supabase_id = data.supabase_id, "
+            "supabase_last_hash = data.payload_hash, "
+            "last_sync_date = %s, write_uid = %s, write_date = %s "
+            "FROM unnest(%s::int[], %s::varchar[], %s::varchar[]) "
+            "AS data(id, supabase_id, payload_hash) "
+            "WHERE form.id = data.id",
+            [now, self.env.uid, now, list(records._ids), list(supabase_ids), list(payload_hashes)],
+        )
+        records.invalidate_recordset(sync_fields)
+
+    def _sync(self, record):
+        """Sync a BIR form to Supabase"""
         if not record:
             return {"success": False, "error": "No record provided"}
 
-        data = {
-            "p_odoo_id": record.id,
-            "p_agency_code": record.agency_id.code,
-            "p_agency_name": record.agency_id.name,
-            "p_form_number": record.name,
-            "p_period_start": record.period_start.isoformat() if record.period_start else None,
-            "p_period_end": record.period_end.isoformat() if record.period_end else None,
-            "p_month": record.month,
-            "p_year": record.year,
-            "p_compensation_tax": float(record.compensation_tax),
-            "p_final_tax": float(record.final_tax),
-            "p_total_tax_withheld": float(record.total_tax_withheld),
-            "p_state": record.state,
-            "p_tin": record.tin or "",
-            "p_rdo_code": record.rdo_code or "",
-        }
+        spec = _SYNC_SPEC[record._name]
+        data = {f"p_{key}": value for key, value in self._sync_rows(record)[0].items()}
+
+        # Skip the RPC when the payload matches the last one synced
+        payload_hash = _payload_hash(data)
+        if record.supabase_synced and payload_hash == record.supabase_last_hash:
+            return {
+                "success": True,
+                "skipped": True,
+                "supabase_id": record.supabase_id,
+                "payload_hash": payload_hash,
+            }
 
-        result = self._make_supabase_request("upsert_bir_1601c", data=data)
+        result = self._make_supabase_request(spec.rpc, data=data)
 
         if result.get("success"):
             result["supabase_id"] = result.get("data", {}).get("id")
-            _logger.info(f"Successfully synced BIR 1601-C {record.name} to Supabase")
+            result["payload_hash"] = payload_hash
+            _logger.info(f"Successfully synced {spec.label} {record.name} to Supabase")
         else:
-            _logger.error(f"Failed to sync BIR 1601-C {record.name}: {result.get('error')}")
+            _logger.error(f"Failed to sync {spec.label} {record.name}: {result.get('error')}")
 
         return result
 
+    def sync_bir_1601c(self, record):
+        """Sync BIR 1601-C form to Supabase"""
+        return self._sync(record)
+
     def sync_bir_2550q(self, record):
         """Sync BIR 2550Q form to Supabase"""
-        if not record:
-            return {"success": False, "error": "No record provided"}
-
-        data = {
-            "p_odoo_id": record.id,
-            "p_agency_code": record.agency_id.code,
-            "p_agency_name": record.agency_id.name,
-            "p_form_number": record.name,
-            "p_quarter_start": record.quarter_start.isoformat() if record.quarter_start else None,
-            "p_quarter_end": record.quarter_end.isoformat() if record.quarter_end else None,
-            "p_quarter": record.quarter,
-            "p_year": record.year,
-            "p_output_vat": float(record.output_vat),
-            "p_input_vat": float(record.input_vat),
-            "p_vat_payable": float(record.vat_payable),
-            "p_state": record.state,
-            "p_tin": record.tin or "",
-            "p_rdo_code": record.rdo_code or "",
-        }
+        return self._sync(record)
 
-        result = self._make_supabase_request("upsert_bir_2550q", data=data)
+    def sync_bir_1702rt(self, record):
+        """Sync BIR 1702-RT form to Supabase"""
+        return self._sync(record)
 
-        if result.get("success"):
-            result["supabase_id"] = result.get("data", {}).get("id")
-            _logger.info(f"Successfully synced BIR 2550Q {record.name} to Supabase")
-        else:
-            _logger.error(f"Failed to sync BIR 2550Q {record.name}: {result.get('error')}")
+    def _sync_requests(self, records):
+        """Build the RPC requests syncing records: batch calls when the form has a batch RPC
 
-        return result
+        Records are read SYNC_BATCH_SIZE at a time as requests are consumed,
+        so only the payloads in flight are held in memory.
+        """
+        spec = _SYNC_SPEC[records._name]
 
-    def sync_bir_1702rt(self, record):
-        """Sync BIR 1702-RT form to Supabase"""
-        if not record:
-            return {"success": False, "error": "No record provided"}
+        for start in range(0, len(records), SYNC_BATCH_SIZE):
+            rows = self._sync_rows(records[start:start + SYNC_BATCH_SIZE])
+            if spec.batch_rpc:
+                yield spec.key, len(rows), spec.batch_rpc, {"p_rows": rows}
+            else:
+                for row in rows:
+                    yield spec.key, 1, spec.rpc, {f"p_{key}": value for key, value in row.items()}
 
-        data = {
-            "p_odoo_id": record.id,
-            "p_agency_code": record.agency_id.code,
-            "p_agency_name": record.agency_id.name,
-            "p_form_number": record.name,
-            "p_fiscal_year": record.fiscal_year,
-            "p_period_start": record.period_start.isoformat() if record.period_start else None,
-            "p_period_end": record.period_end.isoformat() if record.period_end else None,
-            "p_gross_income": float(record.gross_income),
-            "p_deductions": float(record.deductions),
-            "p_taxable_income": float(record.taxable_income),
-            "p_income_tax_due": float(record.income_tax_due),
-            "p_tax_credits": float(record.tax_credits),
-            "p_net_tax_payable": float(record.net_tax_payable),
-            "p_state": record.state,
-            "p_tin": record.tin or "",
-            "p_rdo_code": record.rdo_code or "",
-        }
+    def _run_sync_requests(self, sync_requests, results):
+        """Send RPC requests concurrently and tally records synced per form type
 
-        result = self._make_supabase_request("upsert_bir_1702rt", data=data)
+        Payloads are built on the calling thread as requests are consumed:
+        the worker threads only do HTTP and never touch the environment or
+        cursor. At most SYNC_MAX_IN_FLIGHT requests are queued at a time.
+        """
+        config = self._get_supabase_config()
+        session = _http_session()
+        futures = {}
+
+        def tally(done):
+            for future in done:
+                key, count = futures.pop(future)
+                if future.result().get("success"):
+                    results[key]["success"] += count
+                else:
+                    results[key]["failed"] += count
+
+        with ThreadPoolExecutor(max_workers=SYNC_MAX_WORKERS) as executor:
+            for key, count, endpoint, data in sync_requests:
+                if len(futures) >= SYNC_MAX_IN_FLIGHT:
+                    tally(wait(futures, return_when=FIRST_COMPLETED).done)
+                future = executor.submit(
+                    self._make_supabase_request, endpoint, data=data, session=session, config=config
+                )
+                futures[future] = (key, count)
+            tally(list(as_completed(futures)))
 
-        if result.get("success"):
-            result["supabase_id"] = result.get("data", {}).get("id")
-            _logger.info(f"Successfully synced BIR 1702-RT {record.name} to Supabase")
-        else:
-            _logger.error(f"Failed to sync BIR 1702-RT {record.name}: {result.get('error')}")
+        return results
 
-        return result
+    def sync_bir_1601c_batch(self, records):
+        """Sync BIR 1601-C forms to Supabase, one batch RPC call per chunk"""
+        results = {"bir_1601c": {"success": 0, "failed": 0}}
+        return self._run_sync_requests(self._sync_requests(records), results)["bir_1601c"]
 
     def bulk_sync_all(self):
         """Bulk sync all BIR forms to Supabase"""
-        results = {
-            "bir_1601c": {"success": 0, "failed": 0},
-            "bir_2550q": {"success": 0, "failed": 0},
-            "bir_1702rt": {"success": 0, "failed": 0},
-        }
-
-        # Sync all BIR 1601-C forms
-        forms_1601c = self.env["bir.1601c"].search([("state", "=", "posted")])
-        for form in forms_1601c:
-            result = self.sync_bir_1601c(form)
-            if result.get("success"):
-                results["bir_1601c"]["success"] += 1
-            else:
-                results["bir_1601c"]["failed"] += 1
-
-        # Sync all BIR 2550Q forms
-        forms_2550q = self.env["bir.2550q"].search([("state", "=", "posted")])
-        for form in forms_2550q:
-            result = self.sync_bir_2550q(form)
-            if result.get("success"):
-                results["bir_2550q"]["success"] += 1
-            else:
-                results["bir_2550q"]["failed"] += 1
-
-        # Sync all BIR 1702-RT forms
-        forms_1702rt = self.env["bir.1702rt"].search([("state", "=", "posted")])
-        for form in forms_1702rt:
-            result = self.sync_bir_1702rt(form)
-            if result.get("success"):
-                results["bir_1702rt"]["success"] += 1
-            else:
-                results["bir_1702rt"]["failed"] += 1
+        results = {}
+        sync_requests = []
+        for model_name, spec in _SYNC_SPEC.items():
+            results[spec.key] = {"success": 0, "failed": 0}
+            forms = self.env[model_name].search([("state", "=", "posted")])
+            sync_requests.append(self._sync_requests(forms))
+
+        # All form types are sent concurrently over the shared session,
+        # their requests built lazily as the in-flight window frees up
+        self._run_sync_requests(chain.from_iterable(sync_requests), results)
 
         _logger.info(f"Bulk sync completed: {json.dumps(results)}")
         return results
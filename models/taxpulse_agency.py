@@ -1,7 +1,7 @@
 # Copyright 2025 InsightPulse AI Finance SSC
 # License AGPL-3.0 or later (https://www.gnu.org/licenses/agpl).
 
-from odoo import api, fields, models
+from odoo import fields, models
 
 
 class TaxPulseAgency(models.Model):
@@ -24,7 +24,7 @@ class TaxPulseAgency(models.Model):
     address = fields.Text(string="Address")
     active = fields.Boolean(string="Active", default=True)
 
-    # BIR Form counters
+    # BIR Form counters (non-stored, UI only: recomputed on every read)
     bir_1601c_count = fields.Integer(
         string="1601-C Forms", compute="_compute_bir_form_counts"
     )
@@ -39,19 +39,19 @@ class TaxPulseAgency(models.Model):
         ("code_unique", "UNIQUE(code)", "Agency code must be unique!")
     ]
 
-    @api.depends("code")
     def _compute_bir_form_counts(self):
         """Compute count of BIR forms for each agency"""
-        for agency in self:
-            agency.bir_1601c_count = self.env["bir.1601c"].search_count(
-                [("agency_id", "=", agency.id)]
-            )
-            agency.bir_2550q_count = self.env["bir.2550q"].search_count(
-                [("agency_id", "=", agency.id)]
-            )
-            agency.bir_1702rt_count = self.env["bir.1702rt"].search_count(
-                [("agency_id", "=", agency.id)]
-            )
+        # One grouped count query per form model for the whole recordset
+        for model, field_name in (
+            ("bir.1601c", "bir_1601c_count"),
+            ("bir.2550q", "bir_2550q_count"),
+            ("bir.1702rt", "bir_1702rt_count"),
+        ):
+            counts = dict(self.env[model]._read_group(
+                [("agency_id", "in", self.ids)], ["agency_id"], ["__count"]
+            ))
+            for agency in self:
+                agency[field_name] = counts.get(agency, 0)
 
     def action_view_bir_1601c(self):
         """View 1601-C forms for this agency"""
@@ -0,0 +1,37 @@
+# Copyright 2025 InsightPulse AI Finance SSC
+# License AGPL-3.0 or later (https://www.gnu.org/licenses/agpl).
+
+from odoo import models
+
+
+class TaxPulseSQLComputeMixin(models.AbstractModel):
+    """Bulk storage of stored monetary computes for large recomputes"""
+
+    _name = "taxpulse.sql.compute.mixin"
+    _description = "TaxPulse SQL Compute Mixin"
+
+    # Recomputes over more records than this bypass the ORM write pipeline
+    _SQL_COMPUTE_THRESHOLD = 200
+
+    def _use_sql_compute(self):
+        """Whether a recompute of these records should go through _store_computed_sql"""
+        return len(self) > self._SQL_COMPUTE_THRESHOLD and all(self._ids)
+
+    def _store_computed_sql(self, field_name, values):
+        """
+        Store computed values of a monetary field with one UPDATE and fill the cache
+
+        Bulk recomputes put the values straight into the cache instead of
+        queuing one dirty write per record.
+        """
+        field = self._fields[field_name]
+        values = [
+            field.convert_to_cache(value, record) for value, record in zip(values, self)
+        ]
+        self.env.cr.execute(
+            f'UPDATE "{self._table}" AS rec SET "{field_name}" = data.value '
+            "FROM unnest(%s::int[], %s::numeric[]) AS data(id, value) "
+            "WHERE rec.id = data.id",
+            [list(self._ids), values],
+        )
+        self.env.cache.update(self, field, values)
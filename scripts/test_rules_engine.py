@@ -6,27 +6,67 @@ Processes golden dataset transactions and validates output
 
 import sys
 import csv
+import argparse
+from collections import defaultdict, deque
+from concurrent.futures import Executor, ProcessPoolExecutor
+from contextlib import nullcontext
+from functools import lru_cache
+from itertools import islice
 from pathlib import Path
-from typing import List, Dict, Any
+from typing import Callable, Dict, Any, Iterable, Iterator, List, Optional, Tuple
 
 # Add engine to path
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
 from engine.rules_engine import RulesLoader, RulesEvaluator, FormulaEngine
 
+# Transactions evaluated per apply_rules_batch() call when not verbose
+BATCH_SIZE = 10000
 
-def load_transactions(csv_file: str) -> List[Dict[str, Any]]:
-    """Load transactions from CSV file"""
-    transactions = []
 
-    with open(csv_file, 'r') as f:
-        reader = csv.DictReader(f)
+def load_transactions(csv_file: str) -> Iterator[Dict[str, Any]]:
+    """Stream transactions from CSV file, one row at a time"""
+    with open(csv_file, 'r', newline='') as f:
+        reader = csv.reader(f)
+        header = next(reader)
+        amount_index = header.index('gross_amount')
         for row in reader:
+            if not row:
+                continue
             # Convert gross_amount to float
-            row['gross_amount'] = float(row['gross_amount'])
-            transactions.append(row)
+            row[amount_index] = float(row[amount_index])
+            yield dict(zip(header, row))
+
+
+def iter_chunks(items: Iterable[Any], size: int) -> Iterator[list]:
+    """Split an iterable into lists of at most size items"""
+    iterator = iter(items)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+def map_bounded(
+    pool: Optional[Executor], fn: Callable[..., Any], arg: Any, items: Iterable[Any], in_flight: int
+) -> Iterator[Any]:
+    """
+    Yield fn(arg, item) for each item, in order
+
+    With a pool, at most in_flight calls are submitted ahead of the one
+    being drained, so a large input is never queued (or held in memory)
+    all at once the way Executor.map would.
+    """
+    if pool is None:
+        for item in items:
+            yield fn(arg, item)
+        return
 
-    return transactions
+    pending = deque()
+    for item in items:
+        pending.append(pool.submit(fn, arg, item))
+        if len(pending) >= in_flight:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
 
 
 def load_expected_lines(csv_file: str) -> Dict[str, float]:
@@ -43,16 +83,55 @@ def load_expected_lines(csv_file: str) -> Dict[str, float]:
     return expected
 
 
-def process_transactions(pack_path: str, transactions: List[Dict[str, Any]]) -> Dict[str, Any]:
+@lru_cache(maxsize=None)
+def _chunk_engine(pack_path: str) -> Tuple[RulesEvaluator, tuple, Dict[str, Any]]:
+    """Evaluator, rule sets and rates for evaluate_chunk(), built once per process"""
+    loader = RulesLoader(pack_path)
+    rule_sets = (
+        loader.load_compiled_rules('vat.rules.yaml'),
+        loader.load_compiled_rules('ewt.rules.yaml'),
+    )
+    return RulesEvaluator(), rule_sets, loader.load_rates('ph_rates_2025.json')
+
+
+def evaluate_chunk(pack_path: str, chunk: List[Dict[str, Any]]) -> Tuple[int, Dict[str, float]]:
+    """
+    Compute VAT and EWT bucket totals for a chunk of transactions
+
+    Pure and picklable, so chunks can be fanned out to worker processes.
+
+    Args:
+        pack_path: Path to tax pack (e.g., 'packs/ph/')
+        chunk: List of transaction dictionaries
+
+    Returns:
+        Tuple of (number of transactions, bucket totals)
+    """
+    evaluator, rule_sets, rates_data = _chunk_engine(pack_path)
+    totals = defaultdict(float)
+    for rules in rule_sets:
+        result = evaluator.apply_rules_batch(rules, chunk, rates_data)
+        for bucket, amount in result['buckets'].items():
+            totals[bucket] += amount
+    return len(chunk), dict(totals)
+
+
+def process_transactions(
+    pack_path: str, transactions: Iterable[Dict[str, Any]], verbose: bool = True, jobs: int = 1
+) -> Dict[str, Any]:
     """
     Process transactions through TaxPulse Engine
 
     Args:
         pack_path: Path to tax pack (e.g., 'packs/ph/')
-        transactions: List of transaction dictionaries
+        transactions: Iterable of transaction dictionaries (consumed once)
+        verbose: Report matched buckets per transaction, written in one go
+            after the loop; otherwise transactions are evaluated in vectorized
+            batches
+        jobs: Worker processes for the batches when not verbose
 
     Returns:
-        Dictionary with buckets and form_lines
+        Dictionary with buckets, form_lines and transaction_count
     """
     # Initialize components
     loader = RulesLoader(pack_path)
@@ -60,41 +139,54 @@ def process_transactions(pack_path: str, transactions: List[Dict[str, Any]]) ->
     formula_engine = FormulaEngine()
 
     # Load rules and rates
-    vat_rules = loader.load_rules('vat.rules.yaml')
-    ewt_rules = loader.load_rules('ewt.rules.yaml')
+    vat_rules = loader.load_compiled_rules('vat.rules.yaml')
+    ewt_rules = loader.load_compiled_rules('ewt.rules.yaml')
     rates_data = loader.load_rates('ph_rates_2025.json')
 
     print(f"✅ Loaded {len(vat_rules)} VAT rules")
     print(f"✅ Loaded {len(ewt_rules)} EWT rules")
 
+    # Aggregation rules (priority 200+) are picked out once, up front
+    aggregation_rules = [r for r in vat_rules if r.aggregation_priority is not None]
+
     # Initialize buckets
-    all_buckets = {}
-
-    # Process each transaction
-    for txn in transactions:
-        print(f"\nProcessing: {txn['txn_id']} - {txn['description']}")
-
-        # Apply VAT rules
-        vat_result = evaluator.apply_rules(vat_rules, txn, rates_data)
-        for bucket, amount in vat_result['buckets'].items():
-            if bucket in all_buckets:
-                all_buckets[bucket] += amount
-            else:
-                all_buckets[bucket] = amount
-            print(f"  → {bucket}: ₱{amount:,.2f}")
-
-        # Apply EWT rules
-        ewt_result = evaluator.apply_rules(ewt_rules, txn, rates_data)
-        for bucket, amount in ewt_result['buckets'].items():
-            if bucket in all_buckets:
-                all_buckets[bucket] += amount
-            else:
-                all_buckets[bucket] = amount
-            print(f"  → {bucket}: ₱{amount:,.2f}")
+    all_buckets = defaultdict(float)
+    transaction_count = 0
+    log_lines = []
+
+    if not verbose:
+        # Each rule's contribution to a chunk of transactions is a single
+        # masked numpy sum instead of one dict update per transaction;
+        # chunks are independent, so they can be spread over processes
+        with ProcessPoolExecutor(max_workers=jobs) if jobs > 1 else nullcontext() as pool:
+            chunks = iter_chunks(transactions, BATCH_SIZE)
+            for count, totals in map_bounded(pool, evaluate_chunk, pack_path, chunks, 2 * jobs):
+                transaction_count += count
+                for bucket, amount in totals.items():
+                    all_buckets[bucket] += amount
+    else:
+        # Process each transaction; nothing is printed inside the loop
+        for txn in transactions:
+            transaction_count += 1
+            log_lines.append(f"\nProcessing: {txn['txn_id']} - {txn['description']}")
+
+            # Apply VAT rules, then EWT rules
+            for rules in (vat_rules, ewt_rules):
+                result = evaluator.apply_rules(rules, txn, rates_data, include_matched=True)
+                matched = {rule.get('output_bucket') for rule in result['matched_rules']}
+                for bucket, amount in result['buckets'].items():
+                    all_buckets[bucket] += amount
+                log_lines.extend(
+                    f"  → {bucket}: ₱{amount:,.2f}"
+                    for bucket, amount in result['buckets'].items()
+                    if bucket in matched
+                )
+
+        if log_lines:
+            print("\n".join(log_lines))
 
     # Apply aggregation rules (priority 200+)
-    aggregation_rules = [r for r in vat_rules if r.get('priority', 0) >= 200]
-    all_buckets = formula_engine.evaluate_aggregation_rules(aggregation_rules, all_buckets)
+    all_buckets = formula_engine.evaluate_aggregation_rules(aggregation_rules, dict(all_buckets))
 
     # Load form mapping and evaluate form lines
     mapping = loader.load_mapping('vat_2550Q.mapping.yaml')
@@ -102,7 +194,8 @@ def process_transactions(pack_path: str, transactions: List[Dict[str, Any]]) ->
 
     return {
         'buckets': all_buckets,
-        'form_lines': form_lines
+        'form_lines': form_lines,
+        'transaction_count': transaction_count
     }
 
 
@@ -139,6 +232,13 @@ def validate_results(computed: Dict[str, float], expected: Dict[str, float], tol
 
 def main():
     """Main test execution"""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--quiet", action="store_true", help="skip per-transaction output")
+    parser.add_argument(
+        "--jobs", type=int, default=1, help="worker processes for --quiet runs (default: 1)"
+    )
+    args = parser.parse_args()
+
     print("="*80)
     print("TaxPulse Rules Engine Test")
     print("="*80)
@@ -152,12 +252,14 @@ def main():
     transactions = load_transactions(fixtures_path / "vat_basic_transactions.csv")
     expected_lines = load_expected_lines(fixtures_path / "vat_basic_expected_lines.csv")
 
-    print(f"✅ Loaded {len(transactions)} transactions")
     print(f"✅ Loaded {len(expected_lines)} expected form lines")
 
-    # Process transactions
+    # Process transactions (streamed from the CSV)
     print("\n⚙️  Processing transactions through TaxPulse Engine...")
-    result = process_transactions(str(pack_path), transactions)
+    result = process_transactions(
+        str(pack_path), transactions, verbose=not args.quiet, jobs=args.jobs
+    )
+    print(f"\n✅ Processed {result['transaction_count']} transactions")
 
     # Display bucket totals
     print("\n" + "="*80)
@@ -62,6 +62,65 @@ BEGIN
 END;
 $$;
 
+-- =====================================================
+-- Function: upsert_bir_1601c_batch
+-- Purpose: Upsert a batch of BIR Form 1601-C rows from Odoo
+--          (JSON array of objects keyed by column name)
+-- =====================================================
+CREATE OR REPLACE FUNCTION upsert_bir_1601c_batch(
+    p_rows JSONB
+)
+RETURNS TABLE (odoo_id INTEGER, id UUID)
+LANGUAGE sql
+SECURITY DEFINER
+AS $$
+    -- Upsert with odoo_id as conflict key
+    INSERT INTO bir.form_1601c AS f (
+        odoo_id, agency_code, agency_name, form_number,
+        period_start, period_end, month, year,
+        compensation_tax, final_tax, total_tax_withheld,
+        state, tin, rdo_code
+    )
+    SELECT
+        r.odoo_id, r.agency_code, r.agency_name, r.form_number,
+        r.period_start, r.period_end, r.month, r.year,
+        r.compensation_tax, r.final_tax, r.total_tax_withheld,
+        COALESCE(r.state, 'draft'), r.tin, r.rdo_code
+    FROM jsonb_to_recordset(p_rows) AS r(
+        odoo_id INTEGER,
+        agency_code TEXT,
+        agency_name TEXT,
+        form_number TEXT,
+        period_start DATE,
+        period_end DATE,
+        month TEXT,
+        year TEXT,
+        compensation_tax NUMERIC,
+        final_tax NUMERIC,
+        total_tax_withheld NUMERIC,
+        state TEXT,
+        tin TEXT,
+        rdo_code TEXT
+    )
+    ON CONFLICT (odoo_id)
+    DO UPDATE SET
+        agency_code = EXCLUDED.agency_code,
+        agency_name = EXCLUDED.agency_name,
+        form_number = EXCLUDED.form_number,
+        period_start = EXCLUDED.period_start,
+        period_end = EXCLUDED.period_end,
+        month = EXCLUDED.month,
+        year = EXCLUDED.year,
+        compensation_tax = EXCLUDED.compensation_tax,
+        final_tax = EXCLUDED.final_tax,
+        total_tax_withheld = EXCLUDED.total_tax_withheld,
+        state = EXCLUDED.state,
+        tin = EXCLUDED.tin,
+        rdo_code = EXCLUDED.rdo_code,
+        updated_at = NOW()
+    RETURNING f.odoo_id, f.id;
+$$;
+
 -- =====================================================
 -- Function: upsert_bir_2550q
 -- Purpose: Upsert BIR Form 2550Q from Odoo